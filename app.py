@@ -1,43 +1,75 @@
-from flask import Flask, request, jsonify
-import os, json
+from flask import Flask, request, jsonify, Response, stream_with_context, g
+import os, io, csv, json, time
 from fuzzywuzzy import fuzz
-import pandas as pd
 from datetime import datetime
-import requests
 import re
+import copy
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from state_store import open_state_store
+from candidate_store import CandidateStore
+from config import write_flow_json
+from profiles import ProfileRegistry, DEFAULT_PROFILE, state_key, split_state_key
+from keyword_classifier import KeywordClassifier
+from http_client import post_json, node_url, DEFAULT_TIMEOUT
+from mistral_client import MistralClient, normalize_message, trim_history, without_summaries, STORED_CONTEXT_FACTOR
+from router import HybridRouter, LLM
+from outbox import Outbox
+from campaigns import Campaigns
+from qualification import parse_answers, meets_criteria, UNANSWERED
+from extractors import parse_ctc_lpa, extract
+from chatlog import ChatLog
+from metrics import Metrics
 
 app = Flask(__name__)
 
-STATE_FILE = 'state.json'
-CHATLOG_DIR = 'chatlogs'
-DATA_FILE = 'data.csv'
-FAQ_FILE = 'faq.csv'
-FLOW_FILE = 'flow.json'
 ADMIN_WA_ID = '916200083509@c.us'
 
 # Supabase URL for calling the edge function
 SUPABASE_URL = "https://prhvwjzfpayezelqlmri.supabase.co"
 
-if not os.path.exists(CHATLOG_DIR):
-    os.makedirs(CHATLOG_DIR)
-
-if not os.path.exists(STATE_FILE):
-    with open(STATE_FILE, 'w') as f:
-        json.dump({}, f)
-
-# Load flow from CSV
-df = pd.read_csv(DATA_FILE)
-flow = df.to_dict(orient='records')
-step_order = [q['step'] for q in flow]
-step_map = {q['step']: q for q in flow}
-
-# Save flow to JSON for server.js to use
-with open(FLOW_FILE, 'w') as f:
-    json.dump(flow, f, indent=2)
-
-# Load FAQs from CSV
-faq_df = pd.read_csv(FAQ_FILE) if os.path.exists(FAQ_FILE) else pd.DataFrame(columns=['key', 'response'])
-FAQ_RESPONSES = dict(zip(faq_df['key'], faq_df['response']))
+# Mistral replies (when USE_MISTRAL=true), cached and with a trimmed context
+MISTRAL = MistralClient(f"{SUPABASE_URL}/functions/v1/mistral-chat")
+
+# Decides per message whether the rules or Mistral answer (ROUTER_THRESHOLD)
+ROUTER = HybridRouter()
+
+# Buffered, segment-based chat log (replaces one text file per sender)
+CHATLOG = ChatLog()
+# Gzips segments left by stopped workers and deletes those older than CHATLOG_TTL
+CHATLOG.start_maintenance()
+
+# Side effects that must survive a Node outage or restart (delivered in the background)
+OUTBOX = Outbox()
+# server.js sends a notify batch one message at a time; keep batches small and the
+# read timeout long enough for all of them, but well under the outbox claim (60 s)
+NOTIFY_BATCH_SIZE = 10
+NOTIFY_SECONDS_PER_MESSAGE = 4
+
+# Per-sender conversation state (migrates an existing state.json on first start)
+STATE = open_state_store()
+# Drops idle conversations (CONVERSATION_TTL) and old tombstones (BLOCKED_TTL) in the background
+STATE.start_reaper()
+
+# Candidates indexed by phone and qualification (migrates an existing candidates.json)
+CANDIDATES = CandidateStore()
+
+# Prometheus metrics for /metrics, added up across worker processes
+METRICS = Metrics()
+REQUEST_SECONDS = METRICS.histogram('bot_request_seconds', 'Time to answer an HTTP request', ['endpoint'])
+STAGE_SECONDS = METRICS.histogram('bot_stage_seconds', 'Time spent in each stage of handling a message', ['stage'])
+MESSAGES = METRICS.counter('bot_messages_total', 'Messages handled, by flow step and outcome', ['profile', 'step', 'outcome'])
+METRICS.gauge('bot_active_conversations', 'Conversations in the state store', lambda: STATE.count())
+METRICS.gauge('bot_blocked_senders', 'Blocked senders remembered as tombstones', lambda: STATE.blocked_count())
+METRICS.gauge('bot_outbox_pending', 'Outbox items waiting for delivery', lambda: {
+    (kind,): n for kind, n in OUTBOX.stats()['pending_by_kind'].items()
+}, ['kind'])
+METRICS.gauge('bot_outbox_dead', 'Outbox items that ran out of attempts', lambda: OUTBOX.stats()['dead'])
+METRICS.gauge('bot_campaign_pending', 'Campaign numbers still to be texted', lambda: sum(
+    c['pending'] for c in CAMPAIGNS.all_progress() if c['status'] == 'running'
+))
+METRICS.gauge('bot_mistral_cache_entries', 'Cached Mistral replies in this worker', lambda: len(MISTRAL.cache))
+METRICS.start()
 
 # Updated qualification criteria with more specific rules
 QUALIFICATION_CRITERIA = {
@@ -45,9 +77,20 @@ QUALIFICATION_CRITERIA = {
     'min_ctc': 1,              # Minimum CTC in LPA
     'max_ctc': 6,              # Maximum CTC in LPA
     'notice_period_max': 60,   # Maximum notice period in days
-    'allowed_products': ['home loan', 'housing loan', 'hl', 'loan against property', 'lap', 'mortgage loan']
+    'allowed_products': ['home loan', 'housing loan', 'hl', 'loan against property', 'lap', 'mortgage loan'],
+    # Products accepted at the product step, and the reply to anything else
+    'screening_products': [
+        'home loan', 'housing loan', 'hl', 'loan against property', 'lap', 'mortgage loan',
+        'ghar ka loan', 'home finance', 'loan housing'
+    ],
+    'product_rejection': "Sorry, currently we are only hiring for HL, LAP, Mortgage Loan profiles. We will get back to you if there's a fit in future."
 }
 
+# Job profiles: the flow and FAQs above plus one per directory in profiles/, each
+# cached in memory and reloaded when its CSV files change
+PROFILES = ProfileRegistry(QUALIFICATION_CRITERIA, ADMIN_WA_ID, on_default_reload=write_flow_json)
+PROFILES.get(DEFAULT_PROFILE)
+
 INTEREST_KEYWORDS = [
     "yes", "interested", "sure", "okay", "ok", "haan", "ha", "theek hai", "chalega",
     "kyun nahi", "bilkul", "zaroor", "ready", "main hoon", "done", "i am interested"
@@ -58,6 +101,14 @@ ACKNOWLEDGEMENT_WORDS = [
     "thik hai", "theek hai", "samajh gaya", "shukriya", "dhanyawaad"
 ]
 
+NOT_INTERESTED_KEYWORDS = [
+    "no", "not interested", "nahi", "na", "nope", "not intrested"
+]
+
+CTC_KEYWORDS = [
+    "ctc", "lpa", "package", "salary", "lakhs", "₹", "rs", "pay", "paise"
+]
+
 UNEMPLOYED_PATTERNS = [
     r".*\b(berozgar|be rozgar|naukri nahi|bina kaam|kaam nahi karta|kaam nahi kar raha|no job|not working|currently no job|jobless|main unemployed hoon|main job nahi kar raha|job nahi hai|kahi kaam nahi karta hu|kahi nahi|kaam nahi karta hu)\b.*"
 ]
@@ -66,89 +117,155 @@ FRESHER_KEYWORDS = [
     "fresher", "koi anubhav nahi", "no experience", "0 years", "zero experience", "abhi graduate kiya hai"
 ]
 
-def load_state():
-    with open(STATE_FILE) as f:
-        return json.load(f)
+UNEMPLOYED_REGEXES = [re.compile(p) for p in UNEMPLOYED_PATTERNS]
+
+# All keyword lists in one compiled, word-bounded matcher: one pass per message
+SIGNALS = KeywordClassifier({
+    'interest': INTEREST_KEYWORDS,
+    'acknowledgement': ACKNOWLEDGEMENT_WORDS,
+    'fresher': FRESHER_KEYWORDS,
+    'not_interested': NOT_INTERESTED_KEYWORDS,
+    'ctc': CTC_KEYWORDS
+})
+
+# Threads used by /ask-batch to work through independent senders in parallel
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 8))
+
+# handle_message() outcomes
+SAVE = 'save'
+DELETE = 'delete'
 
-def save_state(state):
-    with open(STATE_FILE, 'w') as f:
-        json.dump(state, f, indent=2)
+def new_user(profile=None):
+    config = (profile or PROFILES.get()).config.current()
+    return {"step": config.machine.first_step(), "answers": {}, "parsed": {}, "flags": {}}
+
+@lru_cache(maxsize=None)
+def match_keywords(match_str):
+    return tuple(k.lower() for k in match_str.split('|'))
 
 def fuzzy_match(message, match_str):
     if not match_str or not isinstance(match_str, str):
         return True
-    keywords = match_str.split('|')
-    return any(fuzz.partial_ratio(message.lower(), k.lower()) > 80 for k in keywords)
-
-def detect_faq(message):
     message = message.lower()
-    for key, response in FAQ_RESPONSES.items():
-        variants = [key.lower()]
-        if key.lower() == "ctc":
-            variants += ["package", "salary", "pay", "ctc kya hai", "kitni salary", "paise", "compensation"]
-        elif key.lower() == "location":
-            variants += ["branch", "location", "job location", "kahan", "place"]
-        elif key.lower() == "profile":
-            variants += ["role", "position", "job role", "kya kaam hoga", "kaunsa role"]
-        elif key.lower() == "company":
-            variants += ["company", "kaunsi company", "organization", "employer"]
-        elif key.lower() == "work from home":
-            variants += ["wfh", "work from home", "remote", "ghar se kaam", "ghar se"]
-        for v in variants:
-            if fuzz.partial_ratio(message, v) > 90:
-                return key
-    return None
+    return any(fuzz.partial_ratio(message, k) > 80 for k in match_keywords(match_str))
+
+def detect_faq(message, config=None):
+    return (config or PROFILES.get().config.current()).faq_index.match(message)
 
 def is_unemployed(message):
     message = message.lower().strip()
     clean = re.sub(r'[^\w\s]', '', message)
-    return any(re.match(p, clean) for p in UNEMPLOYED_PATTERNS)
+    return any(p.match(clean) for p in UNEMPLOYED_REGEXES)
 
-def is_fresher(message):
-    return any(k in message.lower() for k in FRESHER_KEYWORDS)
-
-def detect_interest(message):
-    return any(k in message.lower() for k in INTEREST_KEYWORDS)
-
-def is_qualified(answers):
-    """Determine if a candidate is qualified based on their answers"""
-    try:
-        # Extract experience (convert to float)
-        exp_str = answers.get('experience', '0')
-        experience = float(''.join(c for c in exp_str if c.isdigit() or c == '.') or '0')
-        
-        # Extract CTC (convert to float)
-        ctc_str = answers.get('ctc', '0')
-        ctc = float(''.join(c for c in ctc_str if c.isdigit() or c == '.') or '0')
-        
-        # Extract notice period (convert to days)
-        notice_str = answers.get('notice', '0')
-        notice = 0
-        
-        if 'day' in notice_str.lower():
-            notice = float(''.join(c for c in notice_str if c.isdigit() or c == '.') or '0')
-        elif 'week' in notice_str.lower():
-            notice = float(''.join(c for c in notice_str if c.isdigit() or c == '.') or '0') * 7
-        elif 'month' in notice_str.lower():
-            notice = float(''.join(c for c in notice_str if c.isdigit() or c == '.') or '0') * 30
-        else:
-            notice = float(''.join(c for c in notice_str if c.isdigit() or c == '.') or '0')
-        
-        # Check product
-        product = answers.get('product', '').lower()
-        product_match = any(p in product for p in QUALIFICATION_CRITERIA['allowed_products'])
-        
-        # Check if candidate meets all criteria
-        return (
-            experience >= QUALIFICATION_CRITERIA['min_experience'] and 
-            ctc >= QUALIFICATION_CRITERIA['min_ctc'] and 
-            ctc <= QUALIFICATION_CRITERIA['max_ctc'] and 
-            notice <= QUALIFICATION_CRITERIA['notice_period_max'] and
-            product_match
-        )
-    except Exception as e:
-        print(f"Error in qualification assessment: {e}")
-        return False
+def reads_as_answer(step, message):
+    """Whether `message` is a readable answer to `step` despite a "no" or "nahi" in it,
+    like "no notice" at the notice step or "naukri nahi hai" at the company step"""
+    if step == 'company' and is_unemployed(message):
+        return True
+    return any(value is not None for value in extract(step, message).values())
+
+def candidate_fields(answers, qualified):
+    """Map collected answers to the fields kept in the candidate store"""
+    return {
+        'name': answers.get('company', UNANSWERED),
+        'company': answers.get('company', UNANSWERED),
+        'experience': answers.get('experience', UNANSWERED),
+        'ctc': answers.get('ctc', UNANSWERED),
+        'product': answers.get('product', UNANSWERED),
+        'notice': answers.get('notice', UNANSWERED),
+        'qualified': qualified
+    }
+
+def supabase_payload(phone, answers, qualified):
+    """Candidate row as server.js's /supabase-store expects it"""
+    return {
+        "phone": phone,
+        "name": answers.get('company', UNANSWERED),
+        "experience": answers.get('experience'),
+        "ctc": answers.get('ctc'),
+        "notice_period": answers.get('notice'),
+        "qualification": 'qualified' if qualified else 'not_qualified',
+        "status": 'new'
+    }
+
+def sync_candidate(phone, answers, qualified):
+    """Queue the Supabase upsert of a candidate (via server.js) in the outbox"""
+    OUTBOX.enqueue('supabase_sync', supabase_payload(phone, answers, qualified))
+
+def notify_admin(message, to=None):
+    """Queue a WhatsApp message to the admin (via server.js) in the outbox"""
+    OUTBOX.enqueue('notify', {"to": to or ADMIN_WA_ID, "message": message})
+
+def deliver_candidate_syncs(payloads):
+    """Outbox handler: upsert a batch of candidates in Supabase in one call"""
+    # Supabase rejects a batch that touches the same row twice; the latest answers win
+    latest = {p['phone']: p for p in payloads}
+    # One upsert per set of columns, so rows that leave a column out don't null it
+    by_columns = {}
+    for payload in latest.values():
+        by_columns.setdefault(tuple(sorted(payload)), []).append(payload)
+    for rows in by_columns.values():
+        with STAGE_SECONDS.time('supabase_sync'):
+            post_json(node_url('/supabase-store'), rows)
+    return [True] * len(payloads)
+
+def deliver_notifications(payloads, ids):
+    """Outbox handler: send a batch of WhatsApp notifications in one call"""
+    # server.js sends them one at a time, so allow time for each; the outbox ids
+    # let it skip messages a timed-out earlier attempt already sent
+    messages = [dict(payload, id=item_id) for payload, item_id in zip(payloads, ids)]
+    timeout = (DEFAULT_TIMEOUT[0], DEFAULT_TIMEOUT[1] + NOTIFY_SECONDS_PER_MESSAGE * len(messages))
+    with STAGE_SECONDS.time('notify'):
+        response = post_json(node_url('/notify-batch'), {"messages": messages}, timeout=timeout)
+    return [bool(r.get('ok')) for r in response.json().get('results', [])]
+
+OUTBOX.register('supabase_sync', deliver_candidate_syncs)
+OUTBOX.register('notify', deliver_notifications, batch_size=NOTIFY_BATCH_SIZE, ids=True)
+# Also picks up items left over from a previous run
+OUTBOX.start()
+
+def deliver_campaign_message(to, message):
+    """Send one outreach message through server.js (raises when it could not be sent)"""
+    post_json(node_url('/notify'), {"to": to, "message": message})
+
+def known_senders(senders, profile_id):
+    """Numbers a campaign must not text: {sender: reason} for existing conversations and candidates"""
+    keys = {state_key(profile_id or DEFAULT_PROFILE, sender): sender for sender in senders}
+    known = {
+        keys[key]: 'blocked' if user.get('flags', {}).get('blocked') else 'conversation'
+        for key, user in STATE.get_many(keys).items()
+    }
+    phones = CANDIDATES.existing_phones([sender.split('@')[0] for sender in senders], profile_id)
+    for sender in senders:
+        if sender.split('@')[0] in phones:
+            known.setdefault(sender, 'candidate')
+    return known
+
+def route_to_profile(senders, profile_id):
+    """Campaign numbers answer in the campaign's profile"""
+    if profile_id and profile_id != DEFAULT_PROFILE:
+        PROFILES.assign(senders, profile_id)
+
+# Bulk outreach (numbers.txt and the dashboard), paced by CAMPAIGN_RATE
+CAMPAIGNS = Campaigns(deliver_campaign_message, known=known_senders, on_contact=route_to_profile)
+# Resumes campaigns left unfinished by a previous run
+CAMPAIGNS.start()
+
+def is_qualified(answers, criteria=None, parsed=None):
+    """Determine if a candidate is qualified based on their answers (and the typed ones already extracted)"""
+    criteria = criteria or QUALIFICATION_CRITERIA
+    return meets_criteria(parse_answers(answers, parsed), answers.get('product'), criteria)
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request(response):
+    started = g.get('request_started')
+    if started is not None and request.endpoint:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, request.endpoint)
+    return response
 
 @app.route('/ping', methods=['GET'])
 def ping():
@@ -161,23 +278,143 @@ def update_criteria():
         data = request.json
         if 'criteria' in data:
             criteria = data['criteria']
-            
-            # Update qualification criteria
+            changes = {}
             if 'experienceThreshold' in criteria:
-                QUALIFICATION_CRITERIA['min_experience'] = criteria['experienceThreshold']
+                changes['min_experience'] = criteria['experienceThreshold']
             
             if 'ctcThreshold' in criteria:
-                QUALIFICATION_CRITERIA['min_ctc'] = criteria['ctcThreshold']
+                changes['min_ctc'] = criteria['ctcThreshold']
             
             if 'incentiveThreshold' in criteria:
-                QUALIFICATION_CRITERIA['min_incentive'] = criteria['incentiveThreshold']
-                
-            return jsonify({"success": True, "criteria": QUALIFICATION_CRITERIA})
+                changes['min_incentive'] = criteria['incentiveThreshold']
+
+            # The default profile's criteria unless another profile is named; saved in bot.db
+            # so every worker process picks them up
+            target = PROFILES.update_criteria(data.get('profile'), changes)
+
+            response = {"success": True, "criteria": target}
+            if data.get('requalify'):
+                # Bring stored candidates in line with the new criteria
+                response['requalified'] = requalify_candidates(PROFILES.get(data.get('profile')), target)
+            return jsonify(response)
     except Exception as e:
         print(f"Error updating criteria: {e}")
         
     return jsonify({"success": False, "error": "Failed to update criteria"})
 
+def requalify_candidates(profile, criteria, dry_run=False):
+    """Re-score a profile's stored candidates and sync the ones whose status changed"""
+    diff = CANDIDATES.requalify(criteria, profile=profile.id, dry_run=dry_run)
+    if not dry_run:
+        # Without "status": a changed qualification must not reset the recruiter's status
+        OUTBOX.enqueue_many('supabase_sync', [
+            {k: v for k, v in supabase_payload(c['phone'], c, qualified).items() if k != 'status'}
+            for qualified, flipped in ((True, diff['newly_qualified']), (False, diff['newly_disqualified']))
+            for c in flipped
+        ])
+    return diff
+
+@app.route('/requalify', methods=['POST'])
+def requalify():
+    """Re-evaluate all stored candidates of a profile against its current criteria.
+
+    Body (all optional): {"profile": ..., "dry_run": true, "criteria": {...}}.
+    With dry_run nothing is changed, and "criteria" can override the
+    profile's criteria to preview their effect.
+    """
+    data = request.json or {}
+    try:
+        profile = PROFILES.get(data.get('profile'))
+    except KeyError:
+        return jsonify({"success": False, "error": "Unknown profile"}), 404
+    dry_run = bool(data.get('dry_run'))
+    criteria = profile.criteria
+    if data.get('criteria'):
+        if not dry_run:
+            return jsonify({"success": False, "error": "criteria overrides need dry_run; use /update-criteria"}), 400
+        criteria = {**criteria, **data['criteria']}
+    return jsonify(requalify_candidates(profile, criteria, dry_run=dry_run))
+
+@app.route('/reload-config', methods=['POST'])
+def reload_config():
+    """API endpoint to reload the flow/FAQ files of every loaded profile (or ?profile=) and find new profiles"""
+    PROFILES.scan()
+    try:
+        if request.args.get('profile'):
+            profiles = [PROFILES.get(request.args['profile'])]
+        else:
+            profiles = PROFILES.loaded()
+    except KeyError:
+        return jsonify({"success": False, "error": "Unknown profile"}), 404
+    reloaded, errors = {}, {}
+    for profile in profiles:
+        try:
+            config = profile.config.reload()
+            reloaded[profile.id] = {
+                "steps": config.step_order,
+                "faqs": len(config.faq_responses),
+                "loaded_at": config.loaded_at
+            }
+        except Exception as e:
+            print(f"Error reloading config for profile {profile.id}: {e}")
+            errors[profile.id] = str(e)
+    return jsonify({"success": not errors, "profiles": reloaded, "errors": errors}), 400 if errors else 200
+
+@app.route('/campaigns', methods=['GET'])
+def get_campaigns():
+    """API endpoint to list outreach campaigns with their progress"""
+    return jsonify(CAMPAIGNS.all_progress())
+
+@app.route('/campaigns', methods=['POST'])
+def add_campaign():
+    """Create a campaign or add numbers to one. Body: {"name", "numbers": [...], "messages": [...], "profile"}"""
+    data = request.json or {}
+    numbers, messages = data.get('numbers') or [], data.get('messages')
+    if not data.get('name') or not isinstance(numbers, list) or not (messages is None or isinstance(messages, list)):
+        return jsonify({"success": False, "error": "name, numbers (a list) and messages (a list) are required"}), 400
+    try:
+        profile = PROFILES.get(data.get('profile')).id
+        campaign = CAMPAIGNS.add(data['name'], [str(n) for n in numbers], messages, profile)
+    except KeyError:
+        return jsonify({"success": False, "error": "Unknown profile"}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, "campaign": campaign})
+
+@app.route('/campaigns/<int:campaign_id>', methods=['GET'])
+def get_campaign(campaign_id):
+    """API endpoint to get one campaign's progress"""
+    campaign = CAMPAIGNS.progress(campaign_id)
+    if campaign is None:
+        return jsonify({"error": "Unknown campaign"}), 404
+    return jsonify(campaign)
+
+@app.route('/campaigns/<int:campaign_id>/<action>', methods=['POST'])
+def control_campaign(campaign_id, action):
+    """Pause or resume a campaign (action: pause | resume)"""
+    if action not in ('pause', 'resume'):
+        return jsonify({"success": False, "error": "Unknown action"}), 404
+    if not CAMPAIGNS.set_status(campaign_id, 'paused' if action == 'pause' else 'running'):
+        return jsonify({"success": False, "error": "Unknown or finished campaign"}), 404
+    return jsonify({"success": True, "campaign": CAMPAIGNS.progress(campaign_id)})
+
+@app.route('/profiles', methods=['GET'])
+def get_profiles():
+    """API endpoint to list the job profiles this server runs"""
+    return jsonify([PROFILES.get(profile_id).describe() for profile_id in PROFILES.scan()])
+
+@app.route('/profiles/<profile_id>/assign', methods=['POST'])
+def assign_profile(profile_id):
+    """Route the given senders' messages to a profile. Body: {"senders": [...]}"""
+    senders = (request.json or {}).get('senders') or []
+    if not isinstance(senders, list):
+        return jsonify({"success": False, "error": "senders must be a list"}), 400
+    try:
+        PROFILES.assign(senders, profile_id)
+    except KeyError:
+        return jsonify({"success": False, "error": "Unknown profile"}), 404
+    return jsonify({"success": True, "assigned": len(senders)})
+
 @app.route('/store-candidate', methods=['POST'])
 def store_candidate():
     """Store candidate data from server.js"""
@@ -188,75 +425,19 @@ def store_candidate():
             
         phone = data['phone']
         answers = data['answers']
-        
-        # Save to candidates.json for local backup
-        if os.path.exists('candidates.json'):
-            with open('candidates.json', 'r') as f:
-                candidates = json.load(f)
-        else:
-            candidates = []
-        
-        # Check if candidate with this phone number already exists
-        existing_candidate = next((c for c in candidates if c.get('phone') == phone.split('@')[0]), None)
-        
-        if existing_candidate:
-            # Update existing candidate
-            existing_candidate.update({
-                'name': answers.get('company', 'Unknown'),
-                'experience': answers.get('experience', 'Unknown'),
-                'ctc': answers.get('ctc', 'Unknown'),
-                'notice': answers.get('notice', 'Unknown'),
-                'product': answers.get('product', 'Unknown'),
-                'qualified': answers.get('qualified') == 'qualified',
-                'date_updated': datetime.now().isoformat()
-            })
-        else:
-            # Add new candidate
-            candidates.append({
-                'id': len(candidates) + 1,
-                'name': answers.get('company', 'Unknown'),
-                'phone': phone.split('@')[0],
-                'company': answers.get('company', 'Unknown'),
-                'experience': answers.get('experience', 'Unknown'),
-                'ctc': answers.get('ctc', 'Unknown'),
-                'product': answers.get('product', 'Unknown'),
-                'notice': answers.get('notice', 'Unknown'),
-                'qualified': answers.get('qualified') == 'qualified',
-                'date_added': datetime.now().isoformat()
-            })
-        
-        with open('candidates.json', 'w') as f:
-            json.dump(candidates, f, indent=2)
-        
-        # Now try to store in Supabase directly
         try:
-            # Importing within the function to avoid global imports
-            import requests
-            
-            # Prepare data for Supabase
-            clean_phone = phone.split('@')[0]
-            
-            # Make a request to our server.js endpoint that calls Supabase
-            supabase_payload = {
-                "phone": clean_phone,
-                "name": answers.get('company', 'Unknown'), 
-                "experience": answers.get('experience'),
-                "ctc": answers.get('ctc'),
-                "notice_period": answers.get('notice'),
-                "qualification": 'qualified' if answers.get('qualified') == 'qualified' else 'not_qualified',
-                "status": 'new'
-            }
-            
-            response = requests.post(
-                "http://localhost:3000/supabase-store",
-                json=supabase_payload
-            )
-            
-            if response.status_code != 200:
-                print(f"Error storing in Supabase: {response.text}")
+            profile = PROFILES.get(data.get('profile'))
+        except KeyError:
+            return jsonify({"success": False, "error": "Unknown profile"}), 404
         
-        except Exception as e:
-            print(f"Error storing candidate in Supabase: {e}")
+        # Save to the local candidate store (upsert on phone number and profile)
+        qualified = answers.get('qualified') in ('qualified', 'Yes')
+        with STAGE_SECONDS.time('candidate_save'):
+            CANDIDATES.upsert(phone.split('@')[0], candidate_fields(answers, qualified), profile=profile.id)
+        
+        # Sync to Supabase through server.js in the background
+        with STAGE_SECONDS.time('enqueue'):
+            sync_candidate(phone.split('@')[0], answers, qualified)
         
         return jsonify({"success": True, "message": "Candidate stored successfully"})
             
@@ -264,288 +445,438 @@ def store_candidate():
         print(f"Error in store_candidate: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+def resolve_profile(sender, profile_id=None):
+    """The profile a message belongs to: the one named in the request (which also
+    routes the sender's later messages there), else the sender's assigned one"""
+    if profile_id:
+        profile = PROFILES.get(profile_id)
+        if PROFILES.profile_for(sender) != profile.id:
+            PROFILES.assign([sender], profile.id)
+        return profile
+    return PROFILES.get(PROFILES.profile_for(sender))
+
 @app.route('/ask', methods=['POST'])
 def ask():
     data = request.json
     sender = data['sender']
     message = data['message'].strip()
+    try:
+        profile = resolve_profile(sender, data.get('profile'))
+    except KeyError:
+        return jsonify({"error": "Unknown profile"}), 404
+    key = state_key(profile.id, sender)
+
+    # Messages from one sender are handled strictly one at a time (across
+    # threads and worker processes); different senders run in parallel.
+    lock_started = time.perf_counter()
+    with STATE.lock(key):
+        STAGE_SECONDS.observe(time.perf_counter() - lock_started, 'lock_wait')
+        with STAGE_SECONDS.time('state_load'):
+            user = STATE.get(key) or new_user(profile)
+        reply, outcome = handle_message(sender, message, user, profile)
+        with STAGE_SECONDS.time('state_save'):
+            if outcome == SAVE:
+                STATE.put(key, user)
+            elif outcome == DELETE:
+                STATE.delete(key)
 
-    state = load_state()
-    user = state.get(sender, {"step": "interest", "answers": {}, "flags": {}})
+    return jsonify({"reply": reply})
 
-    # Store conversation history for AI context
-    conversation_history = user.get('conversation_history', [])
-    
-    # Check if we should use Mistral AI instead of rule-based responses
+def handle_message(sender, message, user, profile=None):
+    """Advance one conversation by one message, updating `user` in place.
+
+    Returns (reply, outcome): outcome is SAVE when `user` must be persisted,
+    DELETE when the conversation is complete, or None when nothing changed.
+    Persisting is left to the caller, which must hold the STATE lock for the
+    conversation's state_key().
+    """
+    profile = profile or PROFILES.get()
+    step = user['step']
+    with STAGE_SECONDS.time('handle'):
+        reply, outcome, counted = _handle_message(sender, message, user, profile)
+    MESSAGES.inc(profile.id, step, counted)
+    return reply, outcome
+
+def _handle_message(sender, message, user, profile):
+    """handle_message() plus what happened, for the bot_messages_total counter"""
+    changed = False
+    criteria = profile.criteria
+    # One config snapshot for the whole message, even if a reload swaps it meanwhile
+    config = profile.config.current()
+
+    # Every keyword signal in the message, found in a single pass
+    signals = SIGNALS.classify(message)
+
+    # With Mistral enabled, only messages the rules are unsure about go to it
     use_mistral = os.environ.get('USE_MISTRAL', 'false').lower() == 'true'
-    
+    faq_key = None
+    decision = None
     if use_mistral:
+        with STAGE_SECONDS.time('faq'):
+            faq_key = detect_faq(message, config)
+        step_row = config.step_map.get(user['step'], {})
+        decision = ROUTER.decide(
+            message, user['step'], user.get('flags', {}), signals, faq_key is not None,
+            user['step'] == 'interest' and fuzzy_match(message, step_row.get('match'))
+        )
+        ROUTER.record(decision, profile.id, user['step'])
+
+    if decision is not None and decision.route == LLM:
         try:
-            # Prepare flow and FAQ data
-            with open(DATA_FILE, 'r') as f:
-                flow_data = f.read()
-                
-            with open(FAQ_FILE, 'r') as f:
-                faq_data = f.read()
-            
-            # Add the user message to conversation history
-            conversation_history.append({"role": "user", "content": message})
-            
-            # Call Mistral edge function
-            response = requests.post(
-                f"{SUPABASE_URL}/functions/v1/mistral-chat",
-                json={
-                    "message": message,
-                    "sender": sender,
-                    "conversationHistory": conversation_history
-                }
+            # Conversation so far, without this message (the edge function adds it)
+            conversation_history = without_summaries(user.get('conversation_history', []))
+            last_question = next(
+                (m['content'] for m in reversed(conversation_history) if m.get('role') == 'assistant'), ''
             )
-            
-            if response.status_code == 200:
-                mistral_reply = response.json().get('reply')
-                
-                # Add AI response to conversation history
-                conversation_history.append({"role": "assistant", "content": mistral_reply})
-                
-                # Limit conversation history to last 10 messages
-                if len(conversation_history) > 10:
-                    conversation_history = conversation_history[-10:]
+            with STAGE_SECONDS.time('mistral'):
+                mistral_reply = MISTRAL.reply(
+                    sender, message, conversation_history,
+                    context=(profile.id, user['step'], normalize_message(last_question))
+                )
+            if mistral_reply:
+                # Keep the raw turns, bounded; older ones are summarised when sent
+                conversation_history = trim_history(
+                    conversation_history + [
+                        {"role": "user", "content": message},
+                        {"role": "assistant", "content": mistral_reply}
+                    ],
+                    MISTRAL.context_tokens * STORED_CONTEXT_FACTOR,
+                    summarize=False
+                )
                 
                 # Update user state
                 user['conversation_history'] = conversation_history
-                state[sender] = user
-                save_state(state)
                 
                 # Log the conversation
-                with open(f'{CHATLOG_DIR}/{sender}.txt', 'a', encoding='utf-8') as f:
-                    f.write(f"{datetime.now().isoformat()} - User: {message}\n")
-                    f.write(f"{datetime.now().isoformat()} - AI: {mistral_reply}\n")
+                CHATLOG.append(sender, 'user', message)
+                CHATLOG.append(sender, 'bot', mistral_reply)
                 
-                return jsonify({"reply": mistral_reply})
-            else:
-                print(f"Error from Mistral edge function: {response.text}")
-                # Fall back to rule-based approach
+                return mistral_reply, SAVE, 'mistral'
         except Exception as e:
             print(f"Error calling Mistral: {e}")
             # Fall back to rule-based approach
 
-    # 🔁 Global "not interested" check
-    if any(kw in message.lower() for kw in ["no", "not interested", "nahi", "na", "nope", "not intrested"]):
+    # 🔁 Global "not interested" check ("no notice" at the notice step is an answer, not a refusal)
+    if 'not_interested' in signals and not reads_as_answer(user['step'], message):
         user['flags']['blocked'] = True
         user['flags']['acknowledged'] = True
-        state[sender] = user
-        save_state(state)
-        return jsonify({"reply": "Ok, No Problem"})
+        return "Ok, No Problem", SAVE, 'not_interested'
 
-    if is_fresher(message):
+    if 'fresher' in signals:
         user['flags']['blocked'] = True
         user['flags']['acknowledged'] = False
-        state[sender] = user
-        save_state(state)
-        return jsonify({"reply": "Sorry, currently we require candidates with experience."})
+        return "Sorry, currently we require candidates with experience.", SAVE, 'fresher'
 
     if user.get('flags', {}).get('blocked'):
         if not user['flags'].get('acknowledged'):
-            if any(word in message.lower() for word in ACKNOWLEDGEMENT_WORDS):
+            if 'acknowledgement' in signals:
                 user['flags']['acknowledged'] = True
-                state[sender] = user
-                save_state(state)
-                return jsonify({"reply": "Thanks for understanding 🙏"})
-        return jsonify({"reply": None})
+                return "Thanks for understanding 🙏", SAVE, 'acknowledged'
+        return None, None, 'blocked'
 
     current_step = user["step"]
-    current_index = step_order.index(current_step)
+    if current_step not in config.step_map:
+        # Step removed from the flow by a reload: resume at the first unanswered step
+        current_step = next((s for s in config.step_order if s not in user['answers']), config.step_order[-1])
+        user['step'] = current_step
+        changed = True
 
     # CTC detection
-    ctc_amounts = re.findall(r'(\d+\.?\d*)\s*(lpa|l|lakhs|k|₹|rs|inr)?', message.lower())
-    ctc_detected = any(kw in message.lower() for kw in ["ctc", "lpa", "package", "salary", "lakhs", "₹", "rs", "pay", "paise"])
-    if (ctc_detected and ctc_amounts):
-        try:
-            raw_ctc = float(ctc_amounts[0][0])
-            if ctc_amounts[0][1] in ['k']:
-                raw_ctc = raw_ctc / 100
-            if raw_ctc >= 6:
-                user['flags']['blocked'] = True
-                user['flags']['acknowledged'] = False
-                state[sender] = user
-                save_state(state)
-                return jsonify({"reply": "Sorry, our maximum CTC range is up to 6 LPA only."})
-            else:
-                if current_step == 'ctc':
-                    user['answers']['ctc'] = message
-                state[sender] = user
-                save_state(state)
-        except:
-            pass
+    ctc_amount = parse_ctc_lpa(message) if 'ctc' in signals else None
+    if ctc_amount is not None:
+        if ctc_amount >= criteria['max_ctc']:
+            user['flags']['blocked'] = True
+            user['flags']['acknowledged'] = False
+            return f"Sorry, our maximum CTC range is up to {criteria['max_ctc']:g} LPA only.", SAVE, 'ctc_cap'
+        if current_step == 'ctc':
+            user['answers']['ctc'] = message
+        changed = True
 
     # FAQ detection
-    if not (ctc_detected and ctc_amounts):
-        faq_key = detect_faq(message)
+    if ctc_amount is None:
+        if not use_mistral:
+            with STAGE_SECONDS.time('faq'):
+                faq_key = detect_faq(message, config)
         if faq_key:
-            reply = FAQ_RESPONSES[faq_key]
-            return jsonify({"reply": reply + "\n\n" + step_map[current_step]['ask']})
+            reply = config.faq_responses[faq_key]
+            reply += "\n\n" + config.machine.ask(current_step, user['flags'], user['answers'])
+            return reply, SAVE if changed else None, 'faq'
 
     # Step-wise logic
     if current_step == 'interest':
-        match_str = step_map[current_step].get('match', '')
-        if detect_interest(message):
+        match_str = config.step_map[current_step].get('match', '')
+        if 'interest' in signals:
             pass  # continue normally
-        elif any(k in message.lower() for k in ["no", "not interested", "nahi", "na", "nope"]):
+        elif 'not_interested' in signals:
             user['flags']['blocked'] = True
             user['flags']['acknowledged'] = True
-            state[sender] = user
-            save_state(state)
-            return jsonify({"reply": "Ok, No Problem"})
+            return "Ok, No Problem", SAVE, 'not_interested'
         elif not fuzzy_match(message, match_str):
-            return jsonify({"reply": None})
+            return None, SAVE if changed else None, 'no_match'
 
     if current_step == 'company':
         clean_msg = re.sub(r'[^\w\s]', '', message.lower().strip())
         if is_unemployed(clean_msg):
+            # Turns on the prev_company step (see skip_if in data.csv)
             user['flags']['unemployed'] = True
-            user['answers']['company'] = message
-            user['step'] = 'prev_company'
-            state[sender] = user
-            save_state(state)
-            return jsonify({"reply": step_map['prev_company']['ask']})
-        else:
-            user['answers']['company'] = message
 
     if current_step == 'prev_company':
         if is_unemployed(message):
-            return jsonify({"reply": "Please mention your previous company name."})
+            return "Please mention your previous company name.", SAVE if changed else None, 'no_match'
 
-    if current_step == 'product':
-        allowed_products = [
-            'home loan', 'housing loan', 'hl', 'loan against property', 'lap', 'mortgage loan',
-            'ghar ka loan', 'home finance', 'loan housing'
-        ]
+    if current_step == 'product' and criteria.get('screening_products'):
         message_lower = message.lower()
-        if not any(p in message_lower for p in allowed_products):
+        if not any(p in message_lower for p in criteria['screening_products']):
             user['flags']['blocked'] = True
             user['flags']['acknowledged'] = False
-            state[sender] = user
-            save_state(state)
-            return jsonify({"reply": "Sorry, currently we are only hiring for HL, LAP, Mortgage Loan profiles. We will get back to you if there's a fit in future."})
+            return criteria['product_rejection'], SAVE, 'product_rejected'
 
     user["answers"][current_step] = message
+    # Typed value (CTC in LPA, notice in days, experience in years) read once, as the answer comes in
+    user.setdefault('parsed', {}).update(extract(current_step, message))
 
-    # Move to next step
-    next_index = current_index + 1
-    while next_index < len(step_order):
-        next_step = step_order[next_index]
-        if next_step == 'notice' and user.get('flags', {}).get('unemployed'):
-            next_index += 1
-            continue
-        if next_step == 'product' and user.get('flags', {}).get('unemployed'):
-            reply = "Ok, Which product were you handling previously?"
-        elif next_step == 'prev_company' and not user.get('flags', {}).get('unemployed'):
-            next_index += 1
-            continue
-        else:
-            raw_ask = step_map[next_step]["ask"]
-            reply = raw_ask.format(**user["answers"])
-        user["step"] = next_step
-        break
-    else:
+    # Move to next step (skip/alternative-question rules come from data.csv)
+    next_step = config.machine.next_step(current_step, user['flags'])
+    if next_step is None:
         # All questions done — check qualification and save candidate data
         answers = user["answers"]
-        qualified = is_qualified(answers)
+        parsed = parse_answers(answers, user.get('parsed'))
+        qualified = is_qualified(answers, criteria, parsed)
         
         # Add qualification status to the answers
         answers['qualified'] = "Yes" if qualified else "No"
         answers['phone'] = sender.split('@')[0]
         
         try:
-            # Save to candidates.json for local backup
-            if os.path.exists('candidates.json'):
-                with open('candidates.json', 'r') as f:
-                    candidates = json.load(f)
-            else:
-                candidates = []
-            
-            candidate = {
-                'id': len(candidates) + 1,
-                'name': answers.get('company', 'Unknown'),
-                'phone': sender.split('@')[0],
-                'company': answers.get('company', 'Unknown'),
-                'experience': answers.get('experience', 'Unknown'),
-                'ctc': answers.get('ctc', 'Unknown'),
-                'product': answers.get('product', 'Unknown'),
-                'notice': answers.get('notice', 'Unknown'),
-                'qualified': qualified,
-                'date_added': datetime.now().isoformat()
-            }
-            
-            candidates.append(candidate)
-            
-            with open('candidates.json', 'w') as f:
-                json.dump(candidates, f, indent=2)
-            
-            # Create Supabase record
-            response = requests.post(
-                'http://localhost:3000/store-candidate',
-                json={'phone': sender, 'answers': answers}
-            )
-            
-            if response.status_code != 200:
-                print(f"Error storing candidate in Supabase: {response.text}")
-            
+            # Save to the local candidate store (upsert on phone number)
+            with STAGE_SECONDS.time('candidate_save'):
+                CANDIDATES.upsert(sender.split('@')[0], candidate_fields(answers, qualified),
+                                  profile=profile.id, parsed=parsed)
         except Exception as e:
             print(f"Error saving candidate data: {e}")
         
+        # Supabase sync and admin notification don't hold up the reply
+        with STAGE_SECONDS.time('enqueue'):
+            sync_candidate(sender.split('@')[0], answers, qualified)
+        
         # Format message with qualification status
         qualification_status = "✅ QUALIFIED" if qualified else "❌ NOT QUALIFIED"
         admin_message = f"{qualification_status}\nInfo from {sender}:\n"
+        if profile.id != DEFAULT_PROFILE:
+            admin_message = f"[{profile.title}] {admin_message}"
         admin_message += "\n".join([f"{k}: {v}" for k, v in answers.items()])
-
-        try:
-            requests.post(
-                "http://localhost:3000/notify",
-                json={"to": ADMIN_WA_ID, "message": admin_message}
-            )
-        except Exception as e:
-            print(f"Error notifying admin: {e}")
+        with STAGE_SECONDS.time('enqueue'):
+            notify_admin(admin_message, to=profile.admin)
 
         reply = "__COMPLETE__"
-        state.pop(sender, None)
-        save_state(state)
-        return jsonify({"reply": reply})
-
-    state[sender] = user
-    save_state(state)
-
-    with open(f'{CHATLOG_DIR}/{sender}.txt', 'a', encoding='utf-8') as f:
-        f.write(f"{datetime.now().isoformat()} - {current_step}: {message}\n")
-
-    return jsonify({"reply": reply})
+        return reply, DELETE, 'complete'
+
+    reply = config.machine.ask(next_step, user['flags'], user['answers'])
+    user["step"] = next_step
+
+    CHATLOG.append(sender, 'user', message, step=current_step)
+    CHATLOG.append(sender, 'bot', reply)
+
+    return reply, SAVE, 'answered'
+
+@app.route('/ask-batch', methods=['POST'])
+def ask_batch():
+    """Process a list of queued messages, e.g. everything that arrived while WhatsApp was disconnected.
+
+    Body: {"messages": [{"sender": ..., "message": ..., "profile": optional}, ...]}.
+    Messages from one sender are handled in list order, different senders in parallel, and all
+    conversation state is written in a single transaction at the end. Replies
+    come back in input order.
+    """
+    data = request.json or {}
+    items = data.get('messages') or []
+    if not isinstance(items, list) or not all(isinstance(i, dict) and 'sender' in i and 'message' in i for i in items):
+        return jsonify({"success": False, "error": "messages must be a list of {sender, message}"}), 400
+
+    replies = [None] * len(items)
+    # Conversations are keyed by sender and profile, so group by state key
+    by_sender, profiles = {}, {}
+    for index, item in enumerate(items):
+        try:
+            profile = resolve_profile(item['sender'], item.get('profile'))
+        except KeyError:
+            replies[index] = {"sender": item['sender'], "reply": None, "error": "Unknown profile"}
+            continue
+        key = state_key(profile.id, item['sender'])
+        profiles[key] = profile
+        by_sender.setdefault(key, []).append((index, str(item['message']).strip()))
+
+    def run_sender(key, entries, user):
+        profile = profiles[key]
+        sender = split_state_key(key)[1]
+        outcome = None
+        for position, (index, message) in enumerate(entries):
+            before = copy.deepcopy(user)
+            try:
+                reply, result = handle_message(sender, message, user, profile)
+            except Exception as e:
+                print(f"Error processing batched message from {sender}: {e}")
+                # Keep the state from the last good message and stop, so later
+                # messages are never applied out of order
+                user = before
+                for failed_index, _ in entries[position:]:
+                    replies[failed_index] = {"sender": sender, "reply": None, "error": str(e)}
+                break
+            replies[index] = {"sender": sender, "reply": reply}
+            if result == DELETE:
+                # Conversation finished; any later message starts a new one
+                user, outcome = new_user(profile), DELETE
+            elif result == SAVE:
+                outcome = SAVE
+        return user, outcome
+
+    with STATE.lock_many(by_sender):
+        users = STATE.get_many(by_sender)
+        with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+            futures = {
+                key: pool.submit(run_sender, key, entries, users.get(key) or new_user(profiles[key]))
+                for key, entries in by_sender.items()
+            }
+        updates = {}
+        for key, future in futures.items():
+            user, outcome = future.result()
+            if outcome == SAVE:
+                updates[key] = user
+            elif outcome == DELETE:
+                updates[key] = None
+        STATE.save_many(updates)
+
+    return jsonify({"replies": replies})
+
+CANDIDATE_EXPORT_COLUMNS = ['id', 'name', 'phone', 'company', 'experience', 'ctc', 'product', 'notice',
+                            'experience_years', 'ctc_lpa', 'notice_days', 'qualified', 'date_added', 'date_updated']
+
+def candidate_filters(args):
+    """Read the candidate list/export filters from the query string"""
+    filters = {
+        'date_from': args.get('from'),
+        'date_to': args.get('to'),
+        'product': args.get('product'),
+        'min_ctc': args.get('min_ctc', type=float),
+        'max_ctc': args.get('max_ctc', type=float),
+        'profile': args.get('profile')
+    }
+    if args.get('qualified') is not None:
+        filters['qualified'] = args.get('qualified').lower() in ('1', 'true', 'yes')
+    return filters
+
+def list_candidates(filters):
+    """Candidate list response: one page when limit/cursor is given, otherwise everything"""
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return jsonify(list(CANDIDATES.list(**filters)))
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    candidates, next_cursor = CANDIDATES.page(
+        limit=limit,
+        cursor=request.args.get('cursor', type=int),
+        descending=request.args.get('order', 'asc').lower() == 'desc',
+        **filters
+    )
+    return jsonify({"candidates": candidates, "next_cursor": next_cursor})
 
 @app.route('/candidates', methods=['GET'])
 def get_candidates():
-    """API endpoint to get all candidates"""
-    candidates_file = 'candidates.json'
-    
-    if not os.path.exists(candidates_file):
-        return jsonify([])
-    
-    with open(candidates_file, 'r') as f:
-        candidates = json.load(f)
-    
-    return jsonify(candidates)
+    """API endpoint to get candidates (paginated with ?limit=&cursor=, filterable)"""
+    return list_candidates(candidate_filters(request.args))
 
 @app.route('/qualified-candidates', methods=['GET'])
 def get_qualified_candidates():
     """API endpoint to get only qualified candidates"""
-    candidates_file = 'candidates.json'
-    
-    if not os.path.exists(candidates_file):
-        return jsonify([])
-    
-    with open(candidates_file, 'r') as f:
-        candidates = json.load(f)
-    
-    qualified = [c for c in candidates if c.get('qualified', False)]
-    return jsonify(qualified)
+    filters = candidate_filters(request.args)
+    filters['qualified'] = True
+    return list_candidates(filters)
+
+@app.route('/candidates/stats', methods=['GET'])
+def get_candidate_stats():
+    """API endpoint to get candidate counts without fetching the candidates"""
+    return jsonify({"total": CANDIDATES.count(), "qualified": CANDIDATES.count(qualified=True)})
+
+@app.route('/candidates/export', methods=['GET'])
+def export_candidates():
+    """Stream matching candidates as NDJSON (default) or CSV in constant memory"""
+    filters = candidate_filters(request.args)
+    export_format = request.args.get('format', 'ndjson').lower()
+
+    if export_format == 'csv':
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=CANDIDATE_EXPORT_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            for candidate in CANDIDATES.list(**filters):
+                writer.writerow(candidate)
+                if buffer.tell() > 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        mimetype, filename = 'text/csv', 'candidates.csv'
+    elif export_format == 'ndjson':
+        def generate():
+            for candidate in CANDIDATES.list(**filters):
+                yield json.dumps(candidate) + "\n"
+        mimetype, filename = 'application/x-ndjson', 'candidates.ndjson'
+    else:
+        return jsonify({"success": False, "error": "format must be ndjson or csv"}), 400
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@app.route('/outbox', methods=['GET'])
+def get_outbox():
+    """API endpoint to get the pending side-effect queue depth"""
+    return jsonify(OUTBOX.stats())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics: per-stage latency, messages by step and outcome, queue depths"""
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/router/stats', methods=['GET'])
+def get_router_stats():
+    """API endpoint to get the rules/Mistral routing decisions for threshold tuning"""
+    return jsonify(ROUTER.stats())
+
+@app.route('/mistral/stats', methods=['GET'])
+def get_mistral_stats():
+    """API endpoint to get the Mistral reply cache statistics"""
+    return jsonify(MISTRAL.stats())
+
+@app.route('/chatlogs/<sender>', methods=['GET'])
+def get_chatlog(sender):
+    """API endpoint to get one sender's chat log for BotLogsPage"""
+    if '@' not in sender:
+        sender = f"{sender}@c.us"
+    return jsonify({"sender": sender, "flow": CHATLOG.read(sender)})
+
+@app.route('/conversations', methods=['GET'])
+def get_conversations():
+    """API endpoint to list all active conversations"""
+    conversations = []
+    for key, user, updated_at in STATE.items():
+        profile_id, sender = split_state_key(key)
+        answers = user.get('answers') or {}
+        conversations.append({
+            'id': sender,
+            'profile': profile_id,
+            'phoneNumber': sender.split('@')[0],
+            'lastMessage': list(answers.values())[-1] if answers else "Started conversation",
+            'timestamp': datetime.fromtimestamp(updated_at).isoformat(),
+            'status': "active"
+        })
+    return jsonify(conversations)
+
+@app.route('/active-chats', methods=['GET'])
+def get_active_chats():
+    """API endpoint to get the number of active conversations"""
+    return jsonify({"count": STATE.count()})
 
 if __name__ == '__main__':
-    app.run(port=5000)
+    # Development server; see README for the multi-worker (gunicorn) launch mode
+    app.run(port=5000, threaded=True)
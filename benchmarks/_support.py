@@ -0,0 +1,24 @@
+import os
+import sys
+import glob
+import shutil
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_app():
+    """Import app.py from a scratch working directory.
+
+    app.py keeps its data (bot.db, chatlogs, flow.json) relative to the working
+    directory, so benchmarks run against a copy of the CSV config and never
+    touch a live deployment's files.
+    """
+    workdir = tempfile.mkdtemp(prefix='bot-bench-')
+    for path in glob.glob(os.path.join(REPO_DIR, '*.csv')):
+        shutil.copy(path, workdir)
+    os.chdir(workdir)
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    import app
+    return app
@@ -0,0 +1,90 @@
+"""Measure how long a fresh worker takes to import app.py, and its memory after import.
+
+    python benchmarks/bench_importtime.py [runs]
+
+Each run imports app in a new interpreter (python -X importtime) from a scratch
+copy of the CSV config, so it measures a real cold start: module imports plus
+app.py's own setup (config load, database schema, FAQ index). Prints the median
+total, the slowest top-level imports and the peak RSS, and flags heavy modules
+that should stay off the startup path.
+"""
+import os
+import re
+import sys
+import glob
+import shutil
+import resource
+import tempfile
+import statistics
+import subprocess
+
+from _support import REPO_DIR
+
+# Modules that must not be imported just to start a worker
+HEAVY_MODULES = ['pandas', 'numpy', 'requests']
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def cold_import(workdir):
+    """One cold `import app`.
+
+    Returns (app's cumulative import time in µs, {direct import of app: µs},
+    names of all modules imported, peak RSS in KB).
+    """
+    code = f"import sys; sys.path.insert(0, {REPO_DIR!r}); import app"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=workdir, capture_output=True, text=True, check=True
+    )
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # importtime lists a module after everything it imported, so the direct
+    # imports of app are the depth-1 lines since the previous top-level line
+    children, app_children, names, total = {}, {}, set(), 0
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)) // 2, match.group(4)
+        names.add(name)
+        if depth == 1:
+            children[name] = cumulative
+        elif depth == 0:
+            if name == 'app':
+                total, app_children = cumulative, children
+            children = {}
+    # Peak over all runs so far (RUSAGE_CHILDREN keeps the largest child's peak)
+    return total, app_children, names, rss
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    workdir = tempfile.mkdtemp(prefix='bot-bench-')
+    for path in glob.glob(os.path.join(REPO_DIR, '*.csv')):
+        shutil.copy(path, workdir)
+
+    totals = []
+    try:
+        for _ in range(runs):
+            total, app_children, names, rss = cold_import(workdir)
+            totals.append(total / 1000)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"import app: median {statistics.median(totals):.0f} ms over {runs} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}), peak RSS {rss / 1024:.0f} MB")
+
+    top = sorted(((us, name) for name, us in app_children.items()), reverse=True)
+    print("slowest imports of app.py:")
+    for us, name in top[:10]:
+        print(f"  {us / 1000:7.1f} ms  {name}")
+
+    loaded = [m for m in HEAVY_MODULES if m in names]
+    if loaded:
+        print(f"heavy modules imported at startup: {', '.join(loaded)}")
+    else:
+        print(f"none of {', '.join(HEAVY_MODULES)} imported at startup")
+
+
+if __name__ == '__main__':
+    main()
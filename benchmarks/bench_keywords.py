@@ -0,0 +1,63 @@
+"""Compare the single-pass KeywordClassifier with the old per-list substring scans.
+
+    python benchmarks/bench_keywords.py [iterations]
+
+Prints the time per message for both approaches and the messages on which
+they disagree (the old scans' substring false positives, e.g. "na" in "Kota").
+"""
+import sys
+import time
+
+from _support import import_app
+
+app = import_app()
+
+MESSAGES = [
+    "yes", "ok", "Haan ji interested", "not interested", "I am in Kota", "HDFC Bank Ltd",
+    "30 days", "2 months", "4.5 lpa", "salary kitni hai?", "home loan", "3 years",
+    "10 years in LAP", "fresher hoon", "no problem", "thank you sir", "what is the job location",
+    "Currently working with Bajaj Finance as sales manager for the last 3 years",
+    "Mera notice period 60 days hai aur current CTC 3.2 lakhs hai",
+]
+
+
+def legacy_signals(message):
+    """The checks ask() used to make: one .lower() and one substring scan per list"""
+    signals = set()
+    if any(k in message.lower() for k in app.NOT_INTERESTED_KEYWORDS):
+        signals.add('not_interested')
+    if any(k in message.lower() for k in app.FRESHER_KEYWORDS):
+        signals.add('fresher')
+    if any(k in message.lower() for k in app.ACKNOWLEDGEMENT_WORDS):
+        signals.add('acknowledgement')
+    if any(k in message.lower() for k in app.CTC_KEYWORDS):
+        signals.add('ctc')
+    if any(k in message.lower() for k in app.INTEREST_KEYWORDS):
+        signals.add('interest')
+    return signals
+
+
+def bench(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message in MESSAGES:
+            fn(message)
+    return (time.perf_counter() - start) / (iterations * len(MESSAGES))
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    legacy = bench(legacy_signals, iterations)
+    compiled = bench(app.SIGNALS.classify, iterations)
+    print(f"per-list scans:      {legacy * 1e6:8.2f} us/message")
+    print(f"compiled classifier: {compiled * 1e6:8.2f} us/message ({legacy / compiled:.1f}x)")
+
+    print("\nDifferences (per-list scans -> compiled classifier):")
+    for message in MESSAGES:
+        old, new = legacy_signals(message), app.SIGNALS.classify(message)
+        if old != new:
+            print(f"  {message!r}: {sorted(old)} -> {sorted(new)}")
+
+
+if __name__ == '__main__':
+    main()
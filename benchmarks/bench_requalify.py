@@ -0,0 +1,93 @@
+"""Time bulk requalification of the candidate store against new criteria.
+
+    python benchmarks/bench_requalify.py [candidates]
+
+Fills a scratch candidate store with synthetic candidates (default 100000),
+then re-scores all of them with CandidateStore.requalify() for a few criteria
+changes, and compares with calling is_qualified() on every candidate's answers.
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime
+
+from _support import REPO_DIR
+
+sys.path.insert(0, REPO_DIR)
+
+from db import get_connection, transaction  # noqa: E402
+from candidate_store import CandidateStore, CANDIDATE_FIELDS, TYPED_FIELDS  # noqa: E402
+from qualification import parse_answers, meets_criteria  # noqa: E402
+
+CRITERIA = {
+    'min_experience': 2,
+    'min_ctc': 1,
+    'max_ctc': 6,
+    'notice_period_max': 60,
+    'allowed_products': ['home loan', 'housing loan', 'hl', 'loan against property', 'lap', 'mortgage loan']
+}
+
+ANSWERS = {
+    'experience': ['1 year', '2 years', '3 yrs', '4.5', '6 years', '10', 'Unknown'],
+    'ctc': ['2.5 lpa', '3 lpa', '4.2', '5 lakhs', '5.8 lpa', '7 lpa', 'Unknown'],
+    'notice': ['15 days', '30 days', '1 month', '2 months', '3 months', 'immediate'],
+    'product': ['Home Loan', 'LAP', 'Mortgage loan', 'HL', 'car loan', 'personal loan', 'Unknown'],
+}
+
+
+def fill(store, count):
+    """Insert `count` synthetic candidates in one transaction"""
+    random.seed(7)
+    now = datetime.now().isoformat()
+    rows = []
+    for i in range(count):
+        fields = {k: random.choice(v) for k, v in ANSWERS.items()}
+        fields['name'] = fields['company'] = f"Company {i % 500}"
+        fields['qualified'] = meets_criteria(parse_answers(fields), fields['product'], CRITERIA)
+        parsed = parse_answers(fields)
+        rows.append(
+            [f"91{7000000000 + i}"] + [fields[k] for k in CANDIDATE_FIELDS[:-1]] + [int(fields['qualified']), now]
+            + [parsed[k] for k in TYPED_FIELDS]
+        )
+    conn = get_connection(store.path)
+    with transaction(conn):
+        conn.executemany(
+            """INSERT INTO candidates (phone, name, company, experience, ctc, product, notice, qualified, date_added,
+                                      experience_years, ctc_lpa, notice_days)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows
+        )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workdir = tempfile.mkdtemp(prefix='bot-bench-')
+    store = CandidateStore(path=os.path.join(workdir, 'bench.db'), legacy_file=None)
+    fill(store, count)
+    print(f"{count} candidates")
+
+    for label, change in [
+        ("min_experience 2 -> 3", {'min_experience': 3}),
+        ("max_ctc 6 -> 5", {'max_ctc': 5}),
+        ("notice 60 -> 30 days", {'notice_period_max': 30}),
+    ]:
+        criteria = {**CRITERIA, **change}
+        started = time.perf_counter()
+        diff = store.requalify(criteria, dry_run=True)
+        elapsed = time.perf_counter() - started
+        print(f"  {label:24} {elapsed * 1000:7.1f} ms  +{len(diff['newly_qualified'])} "
+              f"-{len(diff['newly_disqualified'])} ({diff['qualified']} qualified)")
+
+    # The per-candidate path: every answer parsed again for every candidate
+    candidates = list(store.list())
+    started = time.perf_counter()
+    for c in candidates:
+        meets_criteria(parse_answers(c), c['product'], {**CRITERIA, 'min_experience': 3})
+    elapsed = time.perf_counter() - started
+    print(f"  per-candidate is_qualified loop (rows already in memory): {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
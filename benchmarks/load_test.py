@@ -0,0 +1,199 @@
+"""Load-test the /ask conversation pipeline with many concurrent candidates.
+
+    python benchmarks/load_test.py [--candidates 2000] [--concurrency 32] [--preload 0]
+                                   [--mistral] [--mistral-delay 0.2] [--node-delay 0.0]
+
+Simulates candidates walking the data.csv flow (interest -> company -> notice
+-> ctc -> product -> experience -> cv), with FAQ digressions, unemployed
+candidates and the rejections (product, CTC cap, fresher, not interested).
+Every candidate sends its next message in the same round, so all of them are
+mid-conversation at once, and a pool of `--concurrency` threads posts the
+messages to /ask through Flask's test client.
+
+The Node server (/supabase-store, /notify-batch) and the Mistral edge function
+are replaced by a local stub server, so nothing leaves the machine; their
+latency can be simulated with --node-delay and --mistral-delay. --preload
+fills the state store with that many idle conversations first, to see how
+latency holds up as state grows.
+
+Prints p50/p90/p99 latency, messages/sec and RSS, overall and per round.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from _support import import_app
+
+# (weight, messages): one candidate's side of a conversation
+PERSONAS = {
+    'qualified': (30, ["Hi", "yes", "HDFC Bank", "30 days", "4 lpa", "home loan", "3 years", "cv.pdf"]),
+    'faq': (20, ["yes", "salary kitni hai?", "ICICI Bank", "what is the job location", "2 months", "3.5 lpa",
+                 "LAP", "5 years", "sent"]),
+    'unemployed': (10, ["interested", "currently not working", "Bajaj Finance", "4 lpa", "mortgage loan",
+                        "2 years", "resume.pdf"]),
+    'wrong_product': (15, ["haan ji", "Axis Bank", "15 days", "3 lpa", "car loan", "ok thanks"]),
+    'over_ctc': (10, ["yes", "Kotak Mahindra", "immediate", "my ctc is 8 lpa", "ok"]),
+    'fresher': (10, ["yes", "I am a fresher", "ok"]),
+    'not_interested': (5, ["not interested"]),
+}
+
+
+class Stubs(BaseHTTPRequestHandler):
+    """Answers the Node server's and the Mistral edge function's endpoints"""
+
+    node_delay = 0.0
+    mistral_delay = 0.0
+    calls = {}
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'null')
+        with self.lock:
+            self.calls[self.path] = self.calls.get(self.path, 0) + 1
+        if 'mistral' in self.path:
+            time.sleep(self.mistral_delay)
+            reply = {"reply": f"Thanks for asking about \"{body['message']}\". Our team will help you."}
+        else:
+            time.sleep(self.node_delay)
+            if self.path == '/notify-batch':
+                reply = {"results": [{"ok": True} for _ in body["messages"]]}
+            else:
+                reply = {"ok": True}
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stubs(node_delay, mistral_delay):
+    Stubs.node_delay = node_delay
+    Stubs.mistral_delay = mistral_delay
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Stubs)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def rss_mb():
+    """Current resident set size in MB (peak when /proc is not available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def summary(latencies, elapsed):
+    values = sorted(latencies)
+    return (f"{len(values):7} msgs {len(values) / elapsed:8.0f} msg/s  "
+            f"p50 {percentile(values, 50) * 1000:6.2f} ms  p90 {percentile(values, 90) * 1000:6.2f} ms  "
+            f"p99 {percentile(values, 99) * 1000:7.2f} ms  max {values[-1] * 1000 if values else 0:7.1f} ms")
+
+
+def preload(app, count):
+    """`count` idle conversations stuck halfway through the flow"""
+    batch = {}
+    for i in range(count):
+        batch[f"91{8000000000 + i}@c.us"] = {
+            "step": "ctc", "answers": {"interest": "yes", "company": f"Company {i}", "notice": "30 days"}, "flags": {}
+        }
+        if len(batch) == 5000:
+            app.STATE.save_many(batch)
+            batch = {}
+    if batch:
+        app.STATE.save_many(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--candidates', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--preload', type=int, default=0, help="idle conversations in the state store beforehand")
+    parser.add_argument('--mistral', action='store_true', help="USE_MISTRAL=true (hybrid routing)")
+    parser.add_argument('--mistral-delay', type=float, default=0.2, help="seconds per stub Mistral reply")
+    parser.add_argument('--node-delay', type=float, default=0.0, help="seconds per stub Node request")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    stub_url = start_stubs(args.node_delay, args.mistral_delay)
+    os.environ['NODE_SERVER_URL'] = stub_url
+    os.environ['USE_MISTRAL'] = 'true' if args.mistral else 'false'
+    rss_before_import = rss_mb()
+    app = import_app()
+    app.MISTRAL.url = f"{stub_url}/functions/v1/mistral-chat"
+    client = app.app.test_client()
+
+    if args.preload:
+        started = time.perf_counter()
+        preload(app, args.preload)
+        print(f"preloaded {args.preload} conversations in {time.perf_counter() - started:.1f} s")
+
+    random.seed(args.seed)
+    names = list(PERSONAS)
+    weights = [PERSONAS[n][0] for n in names]
+    candidates = [
+        (f"91{9000000000 + i}@c.us", PERSONAS[random.choices(names, weights)[0]][1])
+        for i in range(args.candidates)
+    ]
+
+    def send(sender, message):
+        started = time.perf_counter()
+        response = client.post('/ask', json={"sender": sender, "message": message})
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f"/ask returned {response.status_code} for {sender}: {message!r}")
+        return elapsed
+
+    rss_start = rss_mb()
+    print(f"{args.candidates} candidates, {args.concurrency} threads, mistral={'on' if args.mistral else 'off'}; "
+          f"RSS {rss_before_import:.0f} MB before import, {rss_start:.0f} MB after")
+
+    latencies = []
+    rounds = max(len(messages) for _, messages in candidates)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        for turn in range(rounds):
+            batch = [(sender, messages[turn]) for sender, messages in candidates if turn < len(messages)]
+            round_started = time.perf_counter()
+            round_latencies = list(pool.map(lambda item: send(*item), batch))
+            latencies.extend(round_latencies)
+            print(f"  round {turn + 1:2}  {summary(round_latencies, time.perf_counter() - round_started)}  "
+                  f"RSS {rss_mb():5.0f} MB  conversations {app.STATE.count()}")
+    elapsed = time.perf_counter() - started
+
+    print(f"  total     {summary(latencies, elapsed)}")
+    print(f"RSS {rss_mb():.0f} MB (+{rss_mb() - rss_start:.0f} MB during the run), "
+          f"peak {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    # Let the outbox catch up with the syncs and notifications the run queued
+    app.CHATLOG.flush()
+    deadline = time.time() + 30
+    while app.OUTBOX.stats()['pending'] and time.time() < deadline:
+        time.sleep(0.2)
+    print(f"outbox {app.OUTBOX.stats()}")
+    print(f"stub calls {dict(sorted(Stubs.calls.items()))}")
+    if args.mistral:
+        print(f"router {app.ROUTER.stats()['this_process']}")
+        print(f"mistral {app.MISTRAL.stats()}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,321 @@
+import os
+import json
+import time
+import uuid
+import random
+import threading
+
+from db import get_connection, transaction
+
+# Outreach pace across all campaigns: messages per minute, and how many may go out back to back
+CAMPAIGN_RATE = float(os.environ.get('CAMPAIGN_RATE', 20))
+CAMPAIGN_BURST = int(os.environ.get('CAMPAIGN_BURST', 3))
+
+# Extra random wait after each message, as a fraction of the average interval
+CAMPAIGN_JITTER = float(os.environ.get('CAMPAIGN_JITTER', 0.5))
+
+# Only one worker process sends; it holds this lease and renews it while sending
+LEADER_LEASE_SECONDS = 30
+
+# A number whose delivery keeps failing is given up after this many attempts
+MAX_ATTEMPTS = 5
+
+# After a failed send, all sending pauses this long, doubling per consecutive failure
+BASE_DELAY = 30.0
+MAX_DELAY = 600.0
+
+
+def chat_id(number):
+    """WhatsApp chat ID for a number as typed in numbers.txt ("+91 98290-12345" -> "919829012345@c.us");
+    None when there is no number in it"""
+    number = number.strip()
+    if '@' in number:
+        return number
+    digits = ''.join(c for c in number if c.isdigit())
+    return f"{digits}@c.us" if digits else None
+
+
+class TokenBucket:
+    """`rate` tokens per second, at most `capacity` saved up"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self):
+        """Seconds until a token is available (0 when one is available now)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class Campaigns:
+    """Bulk outreach: a persistent queue of numbers, sent at a steady, jittered pace.
+
+    A campaign is a list of numbers and the start messages each of them gets.
+    Numbers are deduplicated when they are added: numbers already queued or
+    texted by any campaign, and numbers the `known` callback reports (existing
+    candidates or conversations), are recorded as skipped with the reason.
+    The queue lives in SQLite, so sending resumes where it stopped after a
+    restart or a WhatsApp reconnect, and each number remembers how many of its
+    messages went out, so a retry never repeats one.
+
+    `deliver(to, message)` sends one WhatsApp message (raising on failure) and
+    `on_contact(senders, profile_id)` runs before a number's first message.
+    Only one worker process sends at a time (it holds a lease row), and one
+    token bucket paces all campaigns, since WhatsApp limits the account. A
+    failed send pauses all sending with exponential backoff (WhatsApp is
+    most likely disconnected) and retries the same number first.
+    """
+
+    def __init__(self, deliver, known=None, on_contact=None, path=None, rate=CAMPAIGN_RATE, burst=CAMPAIGN_BURST,
+                 jitter=CAMPAIGN_JITTER, poll_interval=2.0):
+        self.deliver = deliver
+        self.known = known
+        self.on_contact = on_contact
+        self.path = path
+        self.bucket = TokenBucket(rate / 60, burst)
+        self.jitter = jitter
+        self.poll_interval = poll_interval
+        self._failures = 0
+        self._resume_at = 0
+        self._owner = uuid.uuid4().hex
+        self._wakeup = threading.Event()
+        self._started = False
+        self._start_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS campaigns (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   name TEXT NOT NULL UNIQUE,
+                   profile TEXT,
+                   messages TEXT NOT NULL,
+                   status TEXT NOT NULL DEFAULT 'running',
+                   created_at REAL NOT NULL,
+                   finished_at REAL
+               )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS campaign_targets (
+                   campaign_id INTEGER NOT NULL,
+                   sender TEXT NOT NULL,
+                   status TEXT NOT NULL DEFAULT 'pending',
+                   sent INTEGER NOT NULL DEFAULT 0,
+                   attempts INTEGER NOT NULL DEFAULT 0,
+                   reason TEXT,
+                   updated_at REAL NOT NULL,
+                   PRIMARY KEY (campaign_id, sender)
+               )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_campaign_targets_due ON campaign_targets (status, campaign_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_campaign_targets_sender ON campaign_targets (sender)")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS campaign_leader (
+                   id INTEGER PRIMARY KEY CHECK (id = 1),
+                   owner TEXT NOT NULL,
+                   expires_at REAL NOT NULL
+               )"""
+        )
+
+    def _conn(self):
+        return get_connection(self.path)
+
+    def add(self, name, numbers, messages=None, profile=None):
+        """Create the campaign `name`, or add numbers to it if it exists; returns its progress.
+
+        Adding the same numbers again (e.g. numbers.txt on every reconnect) queues nothing new.
+        """
+        senders = [s for s in dict.fromkeys(chat_id(n) for n in numbers) if s]
+        conn = self._conn()
+        row = conn.execute("SELECT id, profile, messages FROM campaigns WHERE name = ?", (name,)).fetchone()
+        if row is None and not messages:
+            raise ValueError("A new campaign needs its messages")
+        profile = row['profile'] if row else profile
+        skipped = dict(self.known(senders, profile)) if self.known and senders else {}
+        now = time.time()
+
+        with transaction(conn):
+            if row is None:
+                campaign_id = conn.execute(
+                    "INSERT INTO campaigns (name, profile, messages, created_at) VALUES (?, ?, ?, ?)",
+                    (name, profile, json.dumps(messages), now)
+                ).lastrowid
+            else:
+                campaign_id = row['id']
+                if messages:
+                    conn.execute("UPDATE campaigns SET messages = ? WHERE id = ?", (json.dumps(messages), campaign_id))
+            for start in range(0, len(senders), 500):
+                chunk = senders[start:start + 500]
+                for queued in conn.execute(
+                    f"""SELECT DISTINCT sender FROM campaign_targets
+                        WHERE sender IN ({', '.join('?' * len(chunk))}) AND status != 'skipped'""", chunk
+                ):
+                    skipped.setdefault(queued['sender'], 'contacted')
+            conn.executemany(
+                """INSERT OR IGNORE INTO campaign_targets (campaign_id, sender, status, reason, updated_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                [(campaign_id, s, 'skipped' if s in skipped else 'pending', skipped.get(s), now) for s in senders]
+            )
+            # New numbers reopen a finished campaign
+            conn.execute(
+                """UPDATE campaigns SET status = 'running', finished_at = NULL WHERE id = ? AND status = 'done'
+                   AND EXISTS (SELECT 1 FROM campaign_targets WHERE campaign_id = ? AND status = 'pending')""",
+                (campaign_id, campaign_id)
+            )
+        self.start()
+        self._wakeup.set()
+        return self.progress(campaign_id)
+
+    def set_status(self, campaign_id, status):
+        """Pause ('paused') or resume ('running') a campaign; False if there is no such campaign"""
+        updated = self._conn().execute(
+            "UPDATE campaigns SET status = ? WHERE id = ? AND status != 'done'", (status, campaign_id)
+        ).rowcount
+        self._wakeup.set()
+        return bool(updated)
+
+    def progress(self, campaign_id):
+        conn = self._conn()
+        row = conn.execute("SELECT * FROM campaigns WHERE id = ?", (campaign_id,)).fetchone()
+        if row is None:
+            return None
+        messages = json.loads(row['messages'])
+        counts = {'pending': 0, 'sent': 0, 'failed': 0, 'skipped': 0}
+        skipped_by_reason = {}
+        messages_sent = messages_left = 0
+        for target in conn.execute(
+            """SELECT status, reason, COUNT(*) AS n, SUM(sent) AS sent FROM campaign_targets
+               WHERE campaign_id = ? GROUP BY status, reason""", (campaign_id,)
+        ):
+            counts[target['status']] = counts.get(target['status'], 0) + target['n']
+            messages_sent += target['sent'] or 0
+            if target['status'] == 'skipped':
+                skipped_by_reason[target['reason']] = target['n']
+            elif target['status'] == 'pending':
+                messages_left += target['n'] * len(messages) - (target['sent'] or 0)
+        rate = self.bucket.rate * 60
+        return {
+            "id": row['id'],
+            "name": row['name'],
+            "profile": row['profile'],
+            "status": row['status'],
+            "numbers": sum(counts.values()),
+            **counts,
+            "skipped_by_reason": skipped_by_reason,
+            "messages_sent": messages_sent,
+            "rate_per_minute": rate,
+            "eta_seconds": round(messages_left / rate * 60) if row['status'] == 'running' else None,
+            "created_at": row['created_at'],
+            "finished_at": row['finished_at']
+        }
+
+    def all_progress(self):
+        return [self.progress(row['id']) for row in self._conn().execute("SELECT id FROM campaigns ORDER BY id")]
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            threading.Thread(target=self._run, name='campaigns', daemon=True).start()
+            self._started = True
+
+    def _lead(self):
+        """Take or renew the sender lease; True while this process is the one sending"""
+        now = time.time()
+        return bool(self._conn().execute(
+            """INSERT INTO campaign_leader (id, owner, expires_at) VALUES (1, ?, ?)
+               ON CONFLICT(id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+               WHERE campaign_leader.owner = excluded.owner OR campaign_leader.expires_at < ?""",
+            (self._owner, now + LEADER_LEASE_SECONDS, now)
+        ).rowcount)
+
+    def _next_target(self):
+        return self._conn().execute(
+            """SELECT t.campaign_id, t.sender, t.sent, t.attempts, c.messages, c.profile
+               FROM campaign_targets t JOIN campaigns c ON c.id = t.campaign_id
+               WHERE t.status = 'pending' AND c.status = 'running'
+               ORDER BY t.campaign_id, t.rowid LIMIT 1"""
+        ).fetchone()
+
+    def _finish_campaigns(self):
+        self._conn().execute(
+            """UPDATE campaigns SET status = 'done', finished_at = ? WHERE status = 'running'
+               AND NOT EXISTS (SELECT 1 FROM campaign_targets t WHERE t.campaign_id = campaigns.id
+                               AND t.status = 'pending')""",
+            (time.time(),)
+        )
+
+    def _pace(self):
+        """Wait for a token, plus jitter so messages don't go out on an exact beat"""
+        while True:
+            wait = self.bucket.wait_time()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        self.bucket.take()
+        time.sleep(random.uniform(0, self.jitter / self.bucket.rate))
+
+    def send_next(self):
+        """Send the remaining messages of the next due number; False when nothing is due"""
+        target = self._next_target()
+        if target is None:
+            self._finish_campaigns()
+            return False
+        messages = json.loads(target['messages'])
+        key = (target['campaign_id'], target['sender'])
+        sent, error = target['sent'], None
+        if sent == 0 and self.on_contact:
+            self.on_contact([target['sender']], target['profile'])
+        for message in messages[sent:]:
+            self._pace()
+            if not self._lead():
+                break
+            try:
+                self.deliver(target['sender'], message)
+            except Exception as e:
+                error = str(e)
+                break
+            sent += 1
+            self._conn().execute(
+                "UPDATE campaign_targets SET sent = ?, updated_at = ? WHERE campaign_id = ? AND sender = ?",
+                (sent, time.time(), *key)
+            )
+
+        now = time.time()
+        if sent >= len(messages):
+            self._failures = 0
+            self._conn().execute(
+                "UPDATE campaign_targets SET status = 'sent', updated_at = ? WHERE campaign_id = ? AND sender = ?",
+                (now, *key)
+            )
+        elif error is not None:
+            attempts = target['attempts'] + 1
+            self._failures += 1
+            delay = min(BASE_DELAY * 2 ** (self._failures - 1), MAX_DELAY) * random.uniform(0.8, 1.2)
+            self._resume_at = now + delay
+            print(f"Error sending campaign message to {target['sender']} (attempt {attempts}), "
+                  f"pausing {delay:.0f}s: {error}")
+            self._conn().execute(
+                """UPDATE campaign_targets SET attempts = ?, reason = ?, updated_at = ?, status = ?
+                   WHERE campaign_id = ? AND sender = ?""",
+                (attempts, error, now, 'failed' if attempts >= MAX_ATTEMPTS else 'pending', *key)
+            )
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                while time.time() >= self._resume_at and self._lead() and self.send_next():
+                    pass
+            except Exception as e:
+                print(f"Error in campaign worker: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
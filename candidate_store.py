@@ -0,0 +1,364 @@
+import os
+import json
+import time
+import sqlite3
+from datetime import datetime
+
+from db import get_connection, transaction
+from qualification import parse_answers, qualify_many
+
+LEGACY_CANDIDATES_FILE = 'candidates.json'
+
+CANDIDATE_FIELDS = ['name', 'company', 'experience', 'ctc', 'product', 'notice', 'qualified']
+
+# Bump when the candidates table changes; _upgrade() brings older databases forward
+SCHEMA_VERSION = 5
+
+# Answers parsed for qualification (see qualification.parse_answers), kept next to the raw text
+TYPED_FIELDS = ['experience_years', 'ctc_lpa', 'notice_days']
+
+# Job profile of candidates stored without one (see profiles.DEFAULT_PROFILE)
+DEFAULT_PROFILE = 'default'
+
+
+def _like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class CandidateStore:
+    """Candidates indexed by phone number, job profile and qualification status.
+
+    IDs come from an AUTOINCREMENT key, so they are never reused. There is one
+    record per phone number and profile: storing a candidate twice for the same
+    profile updates the first record, while applying to another profile adds one.
+    """
+
+    def __init__(self, path=None, legacy_file=LEGACY_CANDIDATES_FILE):
+        self.path = path
+        conn = self._conn()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS candidates (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   phone TEXT NOT NULL UNIQUE,
+                   name TEXT,
+                   company TEXT,
+                   experience TEXT,
+                   ctc TEXT,
+                   product TEXT,
+                   notice TEXT,
+                   qualified INTEGER NOT NULL DEFAULT 0,
+                   date_added TEXT NOT NULL,
+                   date_updated TEXT
+               )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_qualified ON candidates (qualified, id)")
+        self._upgrade()
+        if legacy_file:
+            self._migrate(legacy_file)
+
+    def _conn(self):
+        return get_connection(self.path)
+
+    def _migrate(self, legacy_file):
+        """Import an old candidates.json once, keeping its IDs where they are unique"""
+        if not os.path.exists(legacy_file):
+            return
+        conn = self._conn()
+        with transaction(conn):
+            if not os.path.exists(legacy_file):
+                return
+            try:
+                with open(legacy_file) as f:
+                    candidates = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading legacy candidates file: {e}")
+                return
+            for c in candidates:
+                if not c.get('phone'):
+                    continue
+                row = [str(c['phone'])] + [c.get(k) for k in CANDIDATE_FIELDS[:-1]] + [
+                    int(bool(c.get('qualified'))), c.get('date_added') or datetime.now().isoformat(), c.get('date_updated')
+                ]
+                # Later entries for the same phone are newer answers: they win
+                updated = conn.execute(
+                    """UPDATE candidates SET name = ?, company = ?, experience = ?, ctc = ?, product = ?, notice = ?,
+                       qualified = ?, date_updated = ? WHERE phone = ? AND profile = ?""",
+                    row[1:8] + [row[9] or row[8], row[0], DEFAULT_PROFILE]
+                ).rowcount
+                if updated:
+                    continue
+                inserted = conn.execute(
+                    """INSERT OR IGNORE INTO candidates
+                       (id, phone, name, company, experience, ctc, product, notice, qualified, date_added, date_updated)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    [c.get('id')] + row
+                ).rowcount
+                if not inserted:
+                    # Colliding ID from the old len()+1 scheme: take a fresh one
+                    conn.execute(
+                        """INSERT INTO candidates
+                           (phone, name, company, experience, ctc, product, notice, qualified, date_added, date_updated)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        row
+                    )
+            self._parse_typed(conn, "WHERE experience_years IS NULL AND ctc_lpa IS NULL AND notice_days IS NULL")
+            os.replace(legacy_file, legacy_file + '.migrated')
+        print(f"Migrated {len(candidates)} candidates from {legacy_file}")
+
+    def _upgrade(self):
+        conn = self._conn()
+        with transaction(conn):
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                # Numeric CTC for server-side CTC band filters
+                columns = {r['name'] for r in conn.execute("PRAGMA table_info(candidates)")}
+                if 'ctc_lpa' not in columns:
+                    conn.execute("ALTER TABLE candidates ADD COLUMN ctc_lpa REAL")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_date_added ON candidates (date_added)")
+            if version < 2:
+                # Typed answer columns for bulk requalification, and the job profile
+                columns = {r['name'] for r in conn.execute("PRAGMA table_info(candidates)")}
+                for column in TYPED_FIELDS:
+                    if column not in columns:
+                        conn.execute(f"ALTER TABLE candidates ADD COLUMN {column} REAL")
+                if 'profile' not in columns:
+                    conn.execute("ALTER TABLE candidates ADD COLUMN profile TEXT")
+            if version < 3:
+                # Typed answers read with the extractors ("2.5 lakh", "3 months 15 days", ...)
+                self._parse_typed(conn)
+            if version < 4:
+                # ctc_value duplicated ctc_lpa; SQLite before 3.35 can't drop it, and it is just never read
+                columns = {r['name'] for r in conn.execute("PRAGMA table_info(candidates)")}
+                if 'ctc_value' in columns and sqlite3.sqlite_version_info >= (3, 35, 0):
+                    conn.execute("ALTER TABLE candidates DROP COLUMN ctc_value")
+                # The v3 backfill read the 'Unknown' placeholder as an unreadable notice
+                self._parse_typed(conn, "WHERE notice_days IS NULL")
+            if version < 5:
+                # One record per phone and profile instead of per phone: a table rebuild, as
+                # SQLite can't change a UNIQUE constraint in place
+                conn.execute(
+                    """CREATE TABLE candidates_new (
+                           id INTEGER PRIMARY KEY AUTOINCREMENT,
+                           phone TEXT NOT NULL,
+                           name TEXT,
+                           company TEXT,
+                           experience TEXT,
+                           ctc TEXT,
+                           product TEXT,
+                           notice TEXT,
+                           qualified INTEGER NOT NULL DEFAULT 0,
+                           date_added TEXT NOT NULL,
+                           date_updated TEXT,
+                           ctc_lpa REAL,
+                           experience_years REAL,
+                           notice_days REAL,
+                           profile TEXT NOT NULL DEFAULT 'default',
+                           UNIQUE (phone, profile)
+                       )"""
+                )
+                columns = ', '.join(['id', 'phone'] + CANDIDATE_FIELDS + ['date_added', 'date_updated'] + TYPED_FIELDS)
+                conn.execute(
+                    f"""INSERT INTO candidates_new ({columns}, profile)
+                        SELECT {columns}, COALESCE(profile, ?) FROM candidates""",
+                    (DEFAULT_PROFILE,)
+                )
+                last_id = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'candidates'").fetchone()
+                conn.execute("DROP TABLE candidates")
+                conn.execute("ALTER TABLE candidates_new RENAME TO candidates")
+                if last_id:
+                    # IDs are never reused, including those of deleted rows
+                    conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'candidates'", (last_id[0],))
+                conn.execute("CREATE INDEX idx_candidates_qualified ON candidates (qualified, id)")
+                conn.execute("CREATE INDEX idx_candidates_date_added ON candidates (date_added)")
+            if version < SCHEMA_VERSION:
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @staticmethod
+    def _parse_typed(conn, where=""):
+        """Fill the typed answer columns from the stored answers"""
+        for row in conn.execute(f"SELECT id, experience, ctc, notice FROM candidates {where}").fetchall():
+            parsed = parse_answers(dict(row))
+            conn.execute(
+                "UPDATE candidates SET experience_years = ?, ctc_lpa = ?, notice_days = ? WHERE id = ?",
+                [parsed[k] for k in TYPED_FIELDS] + [row['id']]
+            )
+
+    @staticmethod
+    def _to_dict(row):
+        candidate = dict(row)
+        candidate['qualified'] = bool(candidate['qualified'])
+        if candidate['date_updated'] is None:
+            del candidate['date_updated']
+        return candidate
+
+    def upsert(self, phone, fields, profile=None, parsed=None):
+        """Insert a candidate or update the one with this phone number in this profile
+        (the default one if not given); returns the stored record.
+
+        `parsed` are the typed answers if the caller already has them (see
+        qualification.parse_answers); otherwise they are parsed from `fields`.
+        """
+        now = datetime.now().isoformat()
+        values = [fields.get(k) for k in CANDIDATE_FIELDS]
+        values[-1] = int(bool(values[-1]))
+        parsed = parse_answers(fields, parsed)
+        profile = profile or DEFAULT_PROFILE
+        conn = self._conn()
+        with transaction(conn):
+            conn.execute(
+                """INSERT INTO candidates (phone, name, company, experience, ctc, product, notice, qualified, date_added,
+                                          experience_years, ctc_lpa, notice_days, profile)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(phone, profile) DO UPDATE SET
+                       name = excluded.name, company = excluded.company, experience = excluded.experience,
+                       ctc = excluded.ctc, product = excluded.product, notice = excluded.notice,
+                       qualified = excluded.qualified, experience_years = excluded.experience_years,
+                       ctc_lpa = excluded.ctc_lpa, notice_days = excluded.notice_days, date_updated = ?""",
+                [phone] + values + [now] + [parsed[k] for k in TYPED_FIELDS] + [profile, now]
+            )
+            row = conn.execute(
+                "SELECT * FROM candidates WHERE phone = ? AND profile = ?", (phone, profile)
+            ).fetchone()
+        return self._to_dict(row)
+
+    def _get_many(self, ids):
+        """Rows by candidate ID, queried 500 IDs at a time"""
+        rows = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for row in self._conn().execute(
+                f"SELECT * FROM candidates WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ):
+                rows[row['id']] = row
+        return rows
+
+    def existing_phones(self, phones, profile=None):
+        """The subset of these phone numbers that already have a candidate record in this profile"""
+        phones = list(set(phones))
+        found = set()
+        for start in range(0, len(phones), 500):
+            chunk = phones[start:start + 500]
+            found.update(
+                row['phone'] for row in self._conn().execute(
+                    f"SELECT phone FROM candidates WHERE phone IN ({', '.join('?' * len(chunk))}) AND profile = ?",
+                    chunk + [profile or DEFAULT_PROFILE]
+                )
+            )
+        return found
+
+    @staticmethod
+    def _filter_sql(filters):
+        """WHERE clauses for the dashboard/export filters: qualified, date range, product, CTC band"""
+        clauses, params = [], []
+        if filters.get('qualified') is not None:
+            clauses.append("qualified = ?")
+            params.append(int(bool(filters['qualified'])))
+        if filters.get('date_from'):
+            clauses.append("date_added >= ?")
+            params.append(filters['date_from'])
+        if filters.get('date_to'):
+            # Dates are ISO strings; a bare date includes that whole day
+            clauses.append("date_added < ?")
+            date_to = filters['date_to']
+            params.append(date_to + 'T99' if 'T' not in date_to else date_to)
+        if filters.get('product'):
+            clauses.append("LOWER(product) LIKE ? ESCAPE '\\'")
+            params.append('%' + _like_escape(filters['product'].lower()) + '%')
+        if filters.get('min_ctc') is not None:
+            clauses.append("ctc_lpa >= ?")
+            params.append(float(filters['min_ctc']))
+        if filters.get('max_ctc') is not None:
+            clauses.append("ctc_lpa <= ?")
+            params.append(float(filters['max_ctc']))
+        if filters.get('profile'):
+            clauses.append("profile = ?")
+            params.append(filters['profile'])
+        return clauses, params
+
+    def page(self, limit=50, cursor=None, descending=False, **filters):
+        """One page of candidates in ID order, after the candidate ID in `cursor`.
+
+        Returns (candidates, next_cursor); next_cursor is None on the last page.
+        Keyset pagination: each page costs the same however deep the client pages.
+        """
+        clauses, params = self._filter_sql(filters)
+        if cursor is not None:
+            clauses.append("id < ?" if descending else "id > ?")
+            params.append(int(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT * FROM candidates {where} ORDER BY id {'DESC' if descending else 'ASC'} LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        next_cursor = rows[limit - 1]['id'] if len(rows) > limit else None
+        return [self._to_dict(r) for r in rows[:limit]], next_cursor
+
+    def list(self, qualified=None, batch_size=500, **filters):
+        """Yield all matching candidates in ID order, fetching `batch_size` rows at a time.
+
+        Each batch is a separate short query, so a long export neither holds
+        the whole result in memory nor keeps a read transaction open.
+        """
+        cursor = None
+        while True:
+            batch, cursor = self.page(limit=batch_size, cursor=cursor, qualified=qualified, **filters)
+            yield from batch
+            if cursor is None:
+                return
+
+    def count(self, qualified=None):
+        if qualified is None:
+            return self._conn().execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM candidates WHERE qualified = ?", (int(qualified),)
+        ).fetchone()[0]
+
+    def requalify(self, criteria, profile=None, dry_run=False):
+        """Re-evaluate every stored candidate (of one profile, if given) against `criteria`.
+
+        Works on the typed answer columns, so nothing is parsed again, and
+        evaluates them as NumPy arrays. Candidates whose result changed are
+        updated in one transaction (unless dry_run) and returned as
+        {"newly_qualified": [...], "newly_disqualified": [...]} (each with the
+        candidate's stored answers), plus counts and timing.
+        """
+        started = time.perf_counter()
+        clauses, params = self._filter_sql({'profile': profile})
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        # Plain tuples: building sqlite3.Row objects would cost more than the scoring
+        cursor = self._conn().cursor()
+        cursor.row_factory = None
+        rows = cursor.execute(
+            f"""SELECT id, experience_years, ctc_lpa, notice_days, product, qualified
+                FROM candidates {where} ORDER BY id""",
+            params
+        ).fetchall()
+        newly_qualified, newly_disqualified, qualified_count = [], [], 0
+        if rows:
+            import numpy as np
+            ids, experience, ctc, notice, products, qualified = zip(*rows)
+            result = qualify_many(experience, ctc, notice, products, criteria)
+            qualified_count = int(result.sum())
+            flipped = np.flatnonzero(result != np.array(qualified, dtype=bool)).tolist()
+            details = self._get_many([ids[i] for i in flipped])
+            for i in flipped:
+                candidate = {k: details[ids[i]][k] for k in ['id', 'phone'] + CANDIDATE_FIELDS[:-1]}
+                (newly_qualified if result[i] else newly_disqualified).append(candidate)
+
+        if (newly_qualified or newly_disqualified) and not dry_run:
+            now = datetime.now().isoformat()
+            conn = self._conn()
+            with transaction(conn):
+                # Only rows still as read: a candidate stored meanwhile keeps its fresh result
+                conn.executemany(
+                    "UPDATE candidates SET qualified = ?, date_updated = ? WHERE id = ? AND qualified = ?",
+                    [(1, now, c['id'], 0) for c in newly_qualified] + [(0, now, c['id'], 1) for c in newly_disqualified]
+                )
+        return {
+            "evaluated": len(rows),
+            "qualified": qualified_count,
+            "newly_qualified": newly_qualified,
+            "newly_disqualified": newly_disqualified,
+            "dry_run": dry_run,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
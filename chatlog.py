@@ -0,0 +1,302 @@
+import os
+import re
+import gzip
+import json
+import time
+import atexit
+import shutil
+import threading
+from datetime import datetime
+
+from db import get_connection, transaction
+
+CHATLOG_DIR = 'chatlogs'
+
+# Flush when this much is buffered, or every FLUSH_INTERVAL seconds
+FLUSH_BYTES = 64 * 1024
+FLUSH_INTERVAL = 1.0
+
+# Start a new segment (and gzip the old one) past this size
+SEGMENT_BYTES = 16 * 1024 * 1024
+
+# Segments are deleted this long after their last write (seconds; 0 keeps them forever)
+CHATLOG_TTL = float(os.environ.get('CHATLOG_TTL', 90 * 24 * 3600))
+
+# A writer touches its open segment this often, even when idle; an uncompressed segment
+# untouched for STALE_SEGMENT_SECONDS was left behind by a process that is gone
+HEARTBEAT_INTERVAL = 60
+STALE_SEGMENT_SECONDS = 600
+
+# How often segments left behind are compressed and expired ones deleted
+MAINTENANCE_INTERVAL = 3600
+
+# Old per-sender text logs: "<timestamp> - <label>: <message>"
+LEGACY_LINE = re.compile(r'^(\S+) - ([^:]+): (.*)$')
+
+
+class ChatLog:
+    """Append-only chat log shared by all senders.
+
+    append() only adds a record to an in-memory buffer; a flush thread writes
+    the buffer as JSON lines to this process's current segment file once per
+    FLUSH_INTERVAL or when FLUSH_BYTES are buffered (no fsync: a crash can
+    lose the last second of logs, never a reply). Segments are named after the
+    process that writes them, so several workers never share a file, and are
+    gzipped once they pass SEGMENT_BYTES. A SQLite index maps each sender to
+    the segments holding their messages, so reading one conversation opens only
+    those files.
+
+    Segments still open when their process stopped are gzipped by the
+    maintenance thread (see start_maintenance), which also deletes segments
+    older than `ttl`.
+    """
+
+    def __init__(self, directory=CHATLOG_DIR, path=None, flush_bytes=FLUSH_BYTES,
+                 flush_interval=FLUSH_INTERVAL, segment_bytes=SEGMENT_BYTES, ttl=CHATLOG_TTL):
+        self.directory = directory
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.ttl = ttl
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started = False
+        self._segment = None
+        self._segment_seq = 0
+        self._file = None
+        self._touched_at = 0.0
+        self._maintenance_started = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._conn().execute(
+            """CREATE TABLE IF NOT EXISTS chatlog_index (
+                   sender TEXT NOT NULL,
+                   segment TEXT NOT NULL,
+                   first_at TEXT NOT NULL,
+                   PRIMARY KEY (sender, segment)
+               )"""
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS idx_chatlog_index_segment ON chatlog_index (segment)")
+
+    def _conn(self):
+        return get_connection(self.path)
+
+    def append(self, sender, role, message, step=None):
+        """Buffer one chat line; role is 'user' or 'bot'"""
+        record = {"s": sender, "t": datetime.now().isoformat(), "r": role, "m": message}
+        if step:
+            record["step"] = step
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._buffer_lock:
+            self._buffer.append((sender, record["t"], line))
+            self._buffered_bytes += len(line)
+            full = self._buffered_bytes >= self.flush_bytes
+        self._start()
+        if full:
+            self._wakeup.set()
+
+    def _start(self):
+        if self._started:
+            return
+        with self._buffer_lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name='chatlog', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _open_segment(self):
+        self._segment_seq += 1
+        self._segment = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{self._segment_seq:04d}"
+        self._file = open(os.path.join(self.directory, self._segment + '.jsonl'), 'a', encoding='utf-8')
+
+    def _rotate(self):
+        """Close the current segment and gzip it"""
+        self._file.close()
+        self._compress(os.path.join(self.directory, self._segment + '.jsonl'))
+        self._file = self._segment = None
+
+    @staticmethod
+    def _compress(plain):
+        """Replace a .jsonl segment with its .jsonl.gz, keeping its modification time.
+
+        The temporary file is per process, so two workers compressing the same
+        leftover segment both end up with the same result.
+        """
+        modified = os.stat(plain).st_mtime
+        tmp = f"{plain}.gz.{os.getpid()}.tmp"
+        with open(plain, 'rb') as src, gzip.open(tmp, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.utime(tmp, (modified, modified))
+        os.replace(tmp, plain + '.gz')
+        try:
+            os.remove(plain)
+        except FileNotFoundError:
+            pass
+
+    def flush(self):
+        """Write everything buffered so far to the current segment"""
+        with self._write_lock:
+            with self._buffer_lock:
+                pending, self._buffer, self._buffered_bytes = self._buffer, [], 0
+            if not pending:
+                return
+            if self._file is None:
+                self._open_segment()
+            self._file.write(''.join(line for _, _, line in pending))
+            self._file.flush()
+            first_at = {}
+            for sender, at, _ in pending:
+                first_at.setdefault(sender, at)
+            conn = self._conn()
+            with transaction(conn):
+                conn.executemany(
+                    "INSERT OR IGNORE INTO chatlog_index (sender, segment, first_at) VALUES (?, ?, ?)",
+                    [(sender, self._segment, at) for sender, at in first_at.items()]
+                )
+            if self._file.tell() >= self.segment_bytes:
+                self._rotate()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                self._heartbeat()
+            except Exception as e:
+                print(f"Error flushing chat log: {e}")
+
+    def _heartbeat(self):
+        """Keep the open segment's modification time fresh, so maintenance never takes it for abandoned"""
+        now = time.time()
+        if now - self._touched_at < HEARTBEAT_INTERVAL:
+            return
+        with self._write_lock:
+            if self._file is not None:
+                os.utime(os.path.join(self.directory, self._segment + '.jsonl'))
+        self._touched_at = now
+
+    def start_maintenance(self):
+        with self._buffer_lock:
+            if self._maintenance_started:
+                return
+            self._maintenance_started = True
+        threading.Thread(target=self._maintain_forever, name='chatlog-maintenance', daemon=True).start()
+
+    def _maintain_forever(self):
+        while True:
+            try:
+                self.maintain()
+            except Exception as e:
+                print(f"Error maintaining chat logs: {e}")
+            time.sleep(MAINTENANCE_INTERVAL)
+
+    def maintain(self, now=None):
+        """Gzip segments left open by processes that are gone, and delete segments past the TTL.
+
+        Returns {"compressed": n, "deleted": n}.
+        """
+        now = now or time.time()
+        done = {"compressed": 0, "deleted": 0}
+        expired = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.jsonl'):
+                segment = name[:-len('.jsonl')]
+            elif name.endswith('.jsonl.gz'):
+                segment = name[:-len('.jsonl.gz')]
+            elif name.endswith('.tmp'):
+                # Half-written .gz of a compression that was interrupted
+                segment = None
+            else:
+                continue
+            if segment is not None and segment == self._segment:
+                continue
+            file = os.path.join(self.directory, name)
+            try:
+                modified = os.stat(file).st_mtime
+                if segment is None:
+                    if modified < now - STALE_SEGMENT_SECONDS:
+                        os.remove(file)
+                elif self.ttl and modified < now - self.ttl:
+                    os.remove(file)
+                    expired.append(segment)
+                    done["deleted"] += 1
+                elif name.endswith('.jsonl') and modified < now - STALE_SEGMENT_SECONDS:
+                    self._compress(file)
+                    done["compressed"] += 1
+            except FileNotFoundError:
+                # Another worker got to it first
+                continue
+            except OSError as e:
+                # Still open on Windows
+                print(f"Error maintaining chat log segment {name}: {e}")
+        if expired:
+            conn = self._conn()
+            with transaction(conn):
+                conn.executemany("DELETE FROM chatlog_index WHERE segment = ?", [(s,) for s in expired])
+        return done
+
+    def _read_segment(self, segment):
+        plain = os.path.join(self.directory, segment + '.jsonl')
+        try:
+            with open(plain, encoding='utf-8') as f:
+                return f.readlines()
+        except FileNotFoundError:
+            # Rotated (and compressed) since the index was read
+            with gzip.open(plain + '.gz', 'rt', encoding='utf-8') as f:
+                return f.readlines()
+
+    def _read_legacy(self, sender):
+        """Lines from the old chatlogs/<sender>.txt file, if there is one"""
+        legacy_file = os.path.join(self.directory, f'{sender}.txt')
+        if not os.path.exists(legacy_file):
+            return []
+        flow = []
+        with open(legacy_file, encoding='utf-8') as f:
+            for line in f:
+                match = LEGACY_LINE.match(line.rstrip('\n'))
+                if not match:
+                    continue
+                timestamp, label, message = match.groups()
+                entry = {"role": "bot" if label == 'AI' else "user", "message": message, "timestamp": timestamp}
+                if label not in ('AI', 'User'):
+                    entry["step"] = label
+                flow.append(entry)
+        return flow
+
+    def read(self, sender):
+        """A sender's chat lines in time order, as {role, message, timestamp[, step]} dicts"""
+        self.flush()
+        segments = self._conn().execute(
+            "SELECT segment FROM chatlog_index WHERE sender = ? ORDER BY first_at, segment", (sender,)
+        ).fetchall()
+        flow = self._read_legacy(sender)
+        # Cheap substring test first; only lines that mention the sender are decoded
+        needle = json.dumps(sender, ensure_ascii=False)
+        for row in segments:
+            try:
+                lines = self._read_segment(row['segment'])
+            except OSError as e:
+                print(f"Error reading chat log segment {row['segment']}: {e}")
+                continue
+            for line in lines:
+                if needle not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn last line of a segment still being written
+                    continue
+                if record["s"] != sender:
+                    continue
+                entry = {"role": record["r"], "message": record["m"], "timestamp": record["t"]}
+                if "step" in record:
+                    entry["step"] = record["step"]
+                flow.append(entry)
+        flow.sort(key=lambda e: e["timestamp"])
+        return flow
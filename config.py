@@ -0,0 +1,157 @@
+import os
+import csv
+import json
+import time
+import threading
+from datetime import datetime
+
+from faq_index import FaqIndex
+from flow_engine import FlowMachine
+
+DATA_FILE = 'data.csv'
+FAQ_FILE = 'faq.csv'
+FAQ_SYNONYMS_FILE = 'faq_synonyms.csv'
+FLOW_FILE = 'flow.json'
+
+# How often (seconds) current() looks at the files' modification times
+CHECK_INTERVAL = 2.0
+
+
+def read_csv_rows(path, columns):
+    """Rows of a small CSV file as dicts; empty cells become None, blank lines are skipped.
+
+    The csv module instead of pandas: these files are a few rows long, and
+    importing pandas alone took longer than everything else in a worker start.
+    A missing file reads as no rows.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = [row for row in csv.reader(f) if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+    header = [h.strip() for h in rows[0]]
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise ValueError(f"{path} is missing column(s): {', '.join(missing)}")
+    return [
+        {h: (cell if cell != '' else None) for h, cell in zip(header, row)}
+        for row in rows[1:]
+    ]
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class FlowConfig:
+    """One parsed, read-only snapshot of the flow and FAQ files.
+
+    Never modified after it is built: a reload builds a new snapshot and swaps
+    it in, so a message handled with one snapshot sees a consistent flow.
+    """
+
+    def __init__(self, flow, faq_responses, faq_synonyms):
+        self.flow = flow
+        self.step_order = [q['step'] for q in flow]
+        self.step_map = {q['step']: q for q in flow}
+        self.machine = FlowMachine(flow)
+        self.faq_responses = faq_responses
+        self.faq_synonyms = faq_synonyms
+        self.faq_index = FaqIndex(faq_responses, faq_synonyms)
+        self.loaded_at = datetime.now().isoformat()
+
+
+def load_config(data_file=DATA_FILE, faq_file=FAQ_FILE, synonyms_file=FAQ_SYNONYMS_FILE):
+    flow = [row for row in read_csv_rows(data_file, ['step', 'ask']) if row['step']]
+    if not flow:
+        raise ValueError(f"{data_file} has no steps")
+
+    faq_responses = {
+        row['key']: row['response'] for row in read_csv_rows(faq_file, ['key', 'response'])
+        if row['key'] and row['response']
+    }
+
+    # Extra phrasings per FAQ key, e.g. "salary" for "ctc"
+    faq_synonyms = {}
+    for row in read_csv_rows(synonyms_file, ['key', 'variant']):
+        if row['key'] and row['variant']:
+            faq_synonyms.setdefault(row['key'].lower(), []).append(row['variant'])
+
+    return FlowConfig(flow, faq_responses, faq_synonyms)
+
+
+def write_flow_json(config, flow_file=FLOW_FILE):
+    """Save the flow for server.js (written atomically; every worker may do this)"""
+    tmp_flow_file = f'{flow_file}.{os.getpid()}.tmp'
+    with open(tmp_flow_file, 'w') as f:
+        json.dump(config.flow, f, indent=2)
+    os.replace(tmp_flow_file, flow_file)
+
+
+class ConfigManager:
+    """Keeps the current FlowConfig in memory and reloads it when the files change.
+
+    current() is what request handlers call: it returns the cached snapshot and
+    at most every `check_interval` seconds compares the files' modification
+    times, reloading when they moved. reload() forces a reload (the admin
+    endpoint). A file that fails to parse keeps the previous snapshot in use.
+    Each worker process has its own manager; the mtime check brings every
+    worker onto an edited file within `check_interval`.
+    """
+
+    def __init__(self, data_file=DATA_FILE, faq_file=FAQ_FILE, synonyms_file=FAQ_SYNONYMS_FILE,
+                 check_interval=CHECK_INTERVAL, on_reload=None):
+        self.files = (data_file, faq_file, synonyms_file)
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self._lock = threading.Lock()
+        self._mtimes = self._file_mtimes()
+        self._config = load_config(*self.files)
+        self._checked_at = time.monotonic()
+        if on_reload:
+            on_reload(self._config)
+
+    def current(self):
+        config = self._config
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return config
+        with self._lock:
+            if time.monotonic() - self._checked_at >= self.check_interval:
+                self._checked_at = time.monotonic()
+                if self._file_mtimes() != self._mtimes:
+                    self._swap()
+            return self._config
+
+    def reload(self):
+        """Re-read the files now; returns the new snapshot (raises if they don't parse)"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            return self._swap(raise_errors=True)
+
+    def _file_mtimes(self):
+        return tuple(_mtime(p) for p in self.files)
+
+    def _swap(self, raise_errors=False):
+        # Taken before reading, so an edit made while loading triggers another reload
+        mtimes = self._file_mtimes()
+        try:
+            config = load_config(*self.files)
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Error reloading flow/FAQ config, keeping the previous one: {e}")
+            # Don't retry a broken file on every check; wait for the next edit
+            self._mtimes = mtimes
+            return self._config
+        self._config, self._mtimes = config, mtimes
+        print(f"Loaded flow config: {len(config.flow)} steps, {len(config.faq_responses)} FAQs")
+        if self.on_reload:
+            try:
+                self.on_reload(config)
+            except Exception as e:
+                print(f"Error in config reload hook: {e}")
+        return config
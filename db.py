@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Single SQLite database shared by the bot's storage layers
+DB_FILE = os.environ.get('BOT_DB_FILE', 'bot.db')
+
+_local = threading.local()
+
+
+def get_connection(path=None):
+    """Return this thread's connection to the bot database (opened on first use)"""
+    path = path or DB_FILE
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    conn = conns.get(path)
+    if conn is None:
+        # Autocommit mode; writers open explicit transactions via transaction()
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if path != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        conns[path] = conn
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    """Run a block inside a write transaction, taking the write lock up front"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    else:
+        conn.execute('COMMIT')
@@ -0,0 +1,152 @@
+"""Typed values from the candidates' free-text answers.
+
+Each parser takes an answer as typed on WhatsApp and returns a number, or
+None when the answer doesn't say: CTC in LPA, notice period in days and
+experience in years. The patterns are compiled once, here.
+"""
+import re
+
+NUMBER = r'(\d+(?:\.\d+)?)(?!\.?\d)'
+
+_THOUSANDS_COMMA = re.compile(r'(?<=\d),(?=\d)')
+_WORD_NUMBERS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+}
+_NUMBER_WORD = re.compile(r'\b(' + '|'.join(_WORD_NUMBERS) + r')\b')
+_ARTICLE_UNIT = re.compile(r'\ban? (?=(day|week|month|year))')
+
+_CTC = re.compile(NUMBER + r'\s*(lpa|lakhs?|lacs?|lakh|lac|l|k|thousand|cr|crores?)?(?![a-z])')
+_MONTHLY = re.compile(r'per month|/ ?month|\bmonthly\b|\bp\.? ?m\b|\bmahin[ae]\b|\bper mahina\b|\bin hand\b')
+_LAKH_UNITS = {'lpa', 'lakh', 'lakhs', 'lac', 'lacs', 'l'}
+_THOUSAND_UNITS = {'k', 'thousand'}
+
+_NOTICE = re.compile(NUMBER + r'\s*(days?|din|d|weeks?|wks?|w|hafte|hafta|months?|mon|mnths?|mahin[ae]|m)?(?![a-z])')
+_NOTICE_DAYS = {'day': 1, 'week': 7, 'month': 30}
+_IMMEDIATE = re.compile(
+    r'\b(immediate(ly)?|imm?idiate|asap|already (left|resigned|relieved)|not working|no notice|'
+    r'available now|can join (now|today|tomorrow)|turant|abhi join)\b'
+)
+
+_EXPERIENCE = re.compile(NUMBER + r'\s*\+?\s*(years?|yrs?|y|saal|sal|months?|mon|mnths?|m)?(?![a-z])')
+_NO_EXPERIENCE = re.compile(r'\b(fresher|no experience|zero experience|koi anubhav nahi)\b')
+
+
+def _normalize(text):
+    """Lower-case, "3,50,000" -> "350000", "two years" -> "2 years", "a month" -> "1 month\""""
+    text = _THOUSANDS_COMMA.sub('', text.lower())
+    text = _NUMBER_WORD.sub(lambda m: str(_WORD_NUMBERS[m.group(1)]), text)
+    return _ARTICLE_UNIT.sub('1 ', text)
+
+
+def _duration(matches, units, scale):
+    """A duration in the scale's base unit: the first amount with a unit, plus a
+    following amount in a smaller unit ("2 years 6 months", "3 months 15 days").
+    `units` maps each unit word to its base unit ("mnths" -> "month")."""
+    total, last_scale = None, None
+    for value, word in matches:
+        unit = units.get(word)
+        if unit is None:
+            continue
+        if total is not None and scale[unit] >= last_scale:
+            break
+        total = (total or 0) + float(value) * scale[unit]
+        last_scale = scale[unit]
+    return total
+
+
+def parse_ctc_lpa(text):
+    """CTC in lakhs per annum.
+
+    "4.5 lpa", "4.5 lakh", "3 lakh 50 thousand" and "350k" are annual; amounts
+    under a lakh ("25k", "25000") or with "per month" are monthly salaries and
+    are annualised; a bare number under 100 is taken as LPA already.
+    """
+    if not isinstance(text, str):
+        return None
+    text = _normalize(text)
+    matches = _CTC.findall(text)
+    if not matches:
+        return None
+    value, unit = float(matches[0][0]), matches[0][1]
+    if unit in _LAKH_UNITS:
+        lpa = value
+        if len(matches) > 1 and matches[1][1] in _THOUSAND_UNITS:
+            lpa += float(matches[1][0]) / 100
+        return round(lpa, 2)
+    if unit.startswith('cr'):
+        return round(value * 100, 2)
+    if unit in _THOUSAND_UNITS:
+        rupees = value * 1000
+    elif value < 100:
+        return value
+    elif value >= 1000:
+        rupees = value
+    else:
+        return None
+    if _MONTHLY.search(text) or rupees < 100000:
+        rupees *= 12
+    return round(rupees / 100000, 2)
+
+
+_NOTICE_UNITS = {
+    **dict.fromkeys(['d', 'day', 'days', 'din'], 'day'),
+    **dict.fromkeys(['w', 'wk', 'wks', 'week', 'weeks', 'hafte', 'hafta'], 'week'),
+    **dict.fromkeys(['m', 'mon', 'mnth', 'mnths', 'month', 'months', 'mahina', 'mahine'], 'month'),
+}
+
+
+def parse_notice_days(text):
+    """Notice period in days: "30 days", "2 months", "3 months 15 days", "immediate" (0).
+
+    A bare number is read as days ("45"), as it always has been.
+    """
+    if not isinstance(text, str):
+        return None
+    text = _normalize(text)
+    matches = _NOTICE.findall(text)
+    days = _duration(matches, _NOTICE_UNITS, _NOTICE_DAYS)
+    if days is not None:
+        return days
+    if _IMMEDIATE.search(text):
+        return 0.0
+    if matches:
+        return float(matches[0][0])
+    return None
+
+
+_EXPERIENCE_UNITS = {
+    **dict.fromkeys(['y', 'yr', 'yrs', 'year', 'years', 'saal', 'sal'], 'year'),
+    **dict.fromkeys(['m', 'mon', 'mnth', 'mnths', 'month', 'months'], 'month'),
+}
+_EXPERIENCE_YEARS = {'year': 1, 'month': 1 / 12}
+
+
+def parse_experience_years(text):
+    """Years of experience: "3 years", "2.5", "2 years 6 months" (2.5), "18 months" (1.5), "fresher" (0)"""
+    if not isinstance(text, str):
+        return None
+    text = _normalize(text)
+    if _NO_EXPERIENCE.search(text):
+        return 0.0
+    matches = _EXPERIENCE.findall(text)
+    years = _duration(matches, _EXPERIENCE_UNITS, _EXPERIENCE_YEARS)
+    if years is not None:
+        return round(years, 2)
+    return float(matches[0][0]) if matches else None
+
+
+# Flow step -> (typed field, parser); the field names match the candidate store's columns
+STEP_EXTRACTORS = {
+    'experience': ('experience_years', parse_experience_years),
+    'ctc': ('ctc_lpa', parse_ctc_lpa),
+    'notice': ('notice_days', parse_notice_days),
+}
+
+
+def extract(step, answer):
+    """{typed field: value} for an answer to `step`; empty for steps without a parser"""
+    if step not in STEP_EXTRACTORS:
+        return {}
+    field, parser = STEP_EXTRACTORS[step]
+    return {field: parser(answer)}
@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+from fuzzywuzzy import fuzz
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class FaqIndex:
+    """FAQ intent matcher built once from the FAQ keys and their synonyms.
+
+    Matching keeps detect_faq()'s original rule: the first FAQ key (in file
+    order) with any variant scoring fuzz.partial_ratio > threshold wins. A
+    trigram index narrows each message down to the few variants that can
+    possibly score that high, so per-message cost does not grow with the
+    number of FAQ entries.
+
+    Why the prefilter is safe for threshold >= 90: a score above 90 means the
+    shorter string and some window of the longer one match with fewer than 10%
+    of their characters left unmatched. If the shorter string has at most 5
+    characters that allows no unmatched character, so it is an exact
+    substring. Otherwise there are at most (unmatched + 1) matching blocks,
+    which forces one block of 3+ characters: both strings share a trigram.
+    """
+
+    def __init__(self, faqs, synonyms=None, threshold=90):
+        if threshold < 90:
+            raise ValueError("FaqIndex prefilter is only exact for thresholds >= 90")
+        self.threshold = threshold
+        self.variants = []      # (key, variant) in FAQ order
+        self.short_ids = []     # variants too short to have a trigram
+        self.by_trigram = defaultdict(list)
+
+        synonyms = synonyms or {}
+        for key in faqs:
+            seen = set()
+            for variant in [key] + list(synonyms.get(key.lower(), [])):
+                variant = variant.lower().strip()
+                if not variant or variant in seen:
+                    continue
+                seen.add(variant)
+                variant_id = len(self.variants)
+                self.variants.append((key, variant))
+                grams = trigrams(variant)
+                if not grams:
+                    self.short_ids.append(variant_id)
+                for gram in grams:
+                    self.by_trigram[gram].append(variant_id)
+
+    def candidates(self, message):
+        """IDs of the variants that could score above the threshold, in FAQ order"""
+        if len(message) < 3:
+            # Too short for trigrams: only variants that contain the whole message can match
+            return [i for i, (_, v) in enumerate(self.variants) if message and (message in v or v in message)]
+        ids = set(i for i in self.short_ids if self.variants[i][1] in message)
+        for gram in trigrams(message):
+            ids.update(self.by_trigram.get(gram, ()))
+        return sorted(ids)
+
+    def match(self, message):
+        """Return the matching FAQ key for a message, or None"""
+        message = message.lower()
+        for variant_id in self.candidates(message):
+            key, variant = self.variants[variant_id]
+            if fuzz.partial_ratio(message, variant) > self.threshold:
+                return key
+        return None
@@ -0,0 +1,83 @@
+from itertools import product
+
+
+def parse_condition(text):
+    """A flag condition from data.csv: "unemployed", "!unemployed", or several joined by "|" (any).
+
+    Returns a tuple of (flag, expected) pairs; an empty cell means no condition.
+    """
+    if not text:
+        return ()
+    condition = []
+    for part in text.split('|'):
+        part = part.strip()
+        if not part:
+            continue
+        if part.startswith('!'):
+            condition.append((part[1:].strip(), False))
+        else:
+            condition.append((part, True))
+    return tuple(condition)
+
+
+class FlowMachine:
+    """The screening flow compiled into a transition table.
+
+    Steps run in data.csv order. Two optional columns make them conditional on
+    the conversation's flags (e.g. `unemployed`):
+
+    - skip_if: the step is skipped when the condition holds
+      ("!unemployed" skips it unless the flag is set);
+    - alt_if / alt_ask: alt_ask is asked instead of ask when alt_if holds.
+
+    Only the few flags that rules mention can change a transition, so the next
+    step is precomputed for every step and every combination of those flags:
+    advancing a conversation is a dict lookup, however long the flow is.
+    """
+
+    def __init__(self, flow):
+        self.steps = [row['step'] for row in flow]
+        if len(set(self.steps)) != len(self.steps):
+            raise ValueError("data.csv lists a step more than once")
+        self.index = {step: i for i, step in enumerate(self.steps)}
+        self.rows = {row['step']: row for row in flow}
+        self.skip_rules = {row['step']: parse_condition(row.get('skip_if')) for row in flow}
+        self.alt_rules = {row['step']: parse_condition(row.get('alt_if')) for row in flow}
+        for step, rule in self.alt_rules.items():
+            if rule and not self.rows[step].get('alt_ask'):
+                raise ValueError(f"step {step} has alt_if but no alt_ask")
+
+        self.flags = sorted({
+            flag for rules in (self.skip_rules, self.alt_rules) for rule in rules.values() for flag, _ in rule
+        })
+        # (step, flag values) -> the step after it; None after the last step
+        self.transitions = {}
+        for values in product((False, True), repeat=len(self.flags)):
+            state = dict(zip(self.flags, values))
+            following = None
+            for step in reversed(self.steps):
+                self.transitions[step, values] = following
+                if not self._holds(self.skip_rules[step], state):
+                    following = step
+            # Where a new conversation starts
+            self.transitions[None, values] = following
+
+    @staticmethod
+    def _holds(condition, flags):
+        return any(bool(flags.get(flag)) == expected for flag, expected in condition)
+
+    def _key(self, flags):
+        return tuple(bool(flags.get(flag)) for flag in self.flags)
+
+    def first_step(self, flags=None):
+        return self.transitions[None, self._key(flags or {})]
+
+    def next_step(self, step, flags):
+        """The step to ask after `step` given the conversation's flags, or None when the flow is done"""
+        return self.transitions[step, self._key(flags)]
+
+    def ask(self, step, flags, answers):
+        """The question for `step`, with earlier answers filled into {placeholders}"""
+        row = self.rows[step]
+        raw_ask = row['alt_ask'] if self._holds(self.alt_rules[step], flags) else row['ask']
+        return raw_ask.format(**answers)
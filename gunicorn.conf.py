@@ -0,0 +1,14 @@
+# Multi-worker launch mode for the Flask bot (app.py):
+#   gunicorn -c gunicorn.conf.py app:app
+# Conversation state and per-sender locks live in SQLite (bot.db), so any
+# worker/thread may handle any message, and one sender's messages never run
+# at the same time (arrival order is not guaranteed; see the README).
+import os
+import multiprocessing
+
+bind = os.environ.get('BOT_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('BOT_WORKERS', min(multiprocessing.cpu_count(), 4)))
+threads = int(os.environ.get('BOT_THREADS', 8))
+worker_class = 'gthread'
+# Mistral and downstream calls can be slow; keep requests alive long enough
+timeout = 120
@@ -0,0 +1,43 @@
+import os
+import threading
+
+# Node.js server (WhatsApp delivery, Supabase sync)
+NODE_SERVER_URL = os.environ.get('NODE_SERVER_URL', 'http://localhost:3000')
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3, 10)
+MISTRAL_TIMEOUT = (3, 30)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session():
+    """The connection-pooled session shared by all threads of this worker.
+
+    Created (and requests imported) on first use, so starting a worker and
+    answering /ping does not pay for it.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                new_session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+                new_session.mount('http://', adapter)
+                new_session.mount('https://', adapter)
+                _session = new_session
+    return _session
+
+
+def post_json(url, payload, timeout=DEFAULT_TIMEOUT):
+    """POST JSON through the shared session; raises on connection errors and non-2xx replies"""
+    response = session().post(url, json=payload, timeout=timeout)
+    response.raise_for_status()
+    return response
+
+
+def node_url(path):
+    return f"{NODE_SERVER_URL}{path}"
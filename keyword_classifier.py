@@ -0,0 +1,72 @@
+import re
+
+# Keyword edges: a keyword that starts/ends with a letter must not touch
+# another letter there (digits are fine, so "5lpa" still finds "lpa"); one
+# that starts/ends with a digit must not touch any word character (so
+# "10 years" does not find "0 years"); symbols such as "₹" need no boundary.
+_LETTER_AFTER = r'(?![^\W\d])'
+_WORD_AFTER = r'(?!\w)'
+
+
+def _edge(ch, letter, word):
+    if ch.isdigit():
+        return word
+    if ch.isalpha() or ch == '_':
+        return letter
+    return ''
+
+
+def _trie_pattern(phrases):
+    """One regex alternation for all phrases, shaped as a prefix trie.
+
+    Sharing prefixes keeps the engine from re-trying every phrase at every
+    position, and longer continuations are tried before a phrase ends so the
+    longest phrase at a position wins ("not interested" over "no").
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def emit(node, last):
+        branches = [re.escape(ch) + emit(child, ch) for ch, child in sorted(node.items()) if ch]
+        if '' in node:
+            branches.append(_edge(last, _LETTER_AFTER, _WORD_AFTER))
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    # The start boundary is checked after the first character, as a 2-character
+    # lookbehind, so the pattern begins with plain literals and the regex
+    # engine can skip positions that cannot start any phrase.
+    top = []
+    for ch, child in sorted(trie.items()):
+        before = _edge(ch, r'(?<![^\W\d]{0})', r'(?<!\w{0})').format(re.escape(ch))
+        top.append(re.escape(ch) + before + emit(child, ch))
+    return '(?:' + '|'.join(top) + ')'
+
+
+class KeywordClassifier:
+    """Finds every keyword signal in a message with one compiled regex pass.
+
+    `keyword_lists` maps a signal name to its keywords. A keyword listed under
+    several signals (e.g. "ok" for interest and acknowledgement) reports all
+    of them.
+    """
+
+    def __init__(self, keyword_lists):
+        self.signals_by_phrase = {}
+        for signal, keywords in keyword_lists.items():
+            for keyword in keywords:
+                phrase = keyword.lower().strip()
+                self.signals_by_phrase.setdefault(phrase, set()).add(signal)
+        self.pattern = re.compile(_trie_pattern(self.signals_by_phrase))
+
+    def classify(self, message):
+        """The set of signal names present in a message"""
+        signals = set()
+        for m in self.pattern.finditer(message.lower()):
+            signals |= self.signals_by_phrase[m.group(0)]
+        return signals
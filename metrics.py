@@ -0,0 +1,275 @@
+import os
+import json
+import time
+import bisect
+import threading
+
+from db import get_connection, transaction
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# How often each worker publishes its counters, and when a silent worker counts as stopped
+PUBLISH_INTERVAL = 5.0
+STALE_SECONDS = 600
+# Snapshot row that keeps the totals of stopped workers (no process has pid 0)
+RETIRED_PID = 0
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self.values.items()]
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def samples(self, labels, value):
+        yield self.name, labels, value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (the last one is +Inf), sum]
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            child = self.values.get(labels)
+            if child is None:
+                child = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            child[0][index] += 1
+            child[1] += value
+
+    def time(self, *labels):
+        """Context manager that observes how long its block took"""
+        return _Timer(self, labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), [list(counts), total]] for labels, (counts, total) in self.values.items()]
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return [list(value[0]), value[1]]
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1]]
+
+    def samples(self, labels, value):
+        counts, total = value
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            yield f"{self.name}_bucket", labels + [('le', '+Inf' if bound == float('inf') else repr(bound))], cumulative
+        yield f"{self.name}_sum", labels, total
+        yield f"{self.name}_count", labels, cumulative
+
+
+class Gauge:
+    """A value read when /metrics is scraped: `read()` returns a number, or
+    {label tuple: number} for a gauge with labels"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, description, read, labels=()):
+        self.name = name
+        self.description = description
+        self.read = read
+        self.labels = tuple(labels)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _line(name, labels, value):
+    if labels:
+        name += '{' + ','.join(f'{key}="{_escape(v)}"' for key, v in labels) + '}'
+    return f"{name} {value:g}" if isinstance(value, float) else f"{name} {value}"
+
+
+class Metrics:
+    """Counters, histograms and gauges in the Prometheus text format.
+
+    Recording is an in-memory update under a per-metric lock, so it can stay
+    on in production. Each worker process publishes its counters and
+    histograms to the metrics_snapshots table every few seconds, and /metrics
+    adds up the snapshots of all workers, whichever worker gets the scrape.
+    When a worker stops, its totals are folded into a retained row, so counters
+    never go down. Gauges are read at scrape time from shared state, so they
+    are not summed.
+    """
+
+    def __init__(self, path=None, publish_interval=PUBLISH_INTERVAL):
+        self.path = path
+        self.publish_interval = publish_interval
+        self.metrics = []
+        self._started = False
+        self._start_lock = threading.Lock()
+        # (pid, start time) of the process publishing, set again after a fork
+        self._process = None
+        conn = get_connection(path)
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS metrics_snapshots (
+                   pid INTEGER PRIMARY KEY,
+                   data TEXT NOT NULL,
+                   updated_at REAL NOT NULL,
+                   started_at REAL NOT NULL DEFAULT 0
+               )"""
+        )
+        columns = {r['name'] for r in conn.execute("PRAGMA table_info(metrics_snapshots)")}
+        if 'started_at' not in columns:
+            conn.execute("ALTER TABLE metrics_snapshots ADD COLUMN started_at REAL NOT NULL DEFAULT 0")
+
+    def counter(self, name, description, labels=()):
+        return self._add(Counter(name, description, labels))
+
+    def histogram(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, description, labels, buckets))
+
+    def gauge(self, name, description, read, labels=()):
+        return self._add(Gauge(name, description, read, labels))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            threading.Thread(target=self._run, name='metrics', daemon=True).start()
+            self._started = True
+
+    def _run(self):
+        while True:
+            time.sleep(self.publish_interval)
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Error publishing metrics: {e}")
+
+    def publish(self):
+        """Write this worker's counters and histograms for the other workers to read"""
+        pid = os.getpid()
+        if self._process is None or self._process[0] != pid:
+            self._process = (pid, time.time())
+        data = {m.name: m.snapshot() for m in self.metrics if m.kind != 'gauge'}
+        conn = get_connection(self.path)
+        with transaction(conn):
+            # A row under our pid from an earlier process is that process's final totals
+            previous = conn.execute(
+                "SELECT pid FROM metrics_snapshots WHERE pid = ? AND started_at != ?", (pid, self._process[1])
+            ).fetchall()
+            self._retire(conn, previous)
+            conn.execute(
+                "INSERT OR REPLACE INTO metrics_snapshots (pid, data, updated_at, started_at) VALUES (?, ?, ?, ?)",
+                (pid, json.dumps(data), time.time(), self._process[1])
+            )
+
+    def _add_up(self, merged, data):
+        """Add one snapshot ({name: [[labels, value], ...]}) into merged"""
+        by_name = {m.name: m for m in self.metrics}
+        for name, values in data.items():
+            metric = by_name.get(name)
+            if metric is None:
+                continue
+            target = merged.setdefault(name, {})
+            for labels, value in values:
+                labels = tuple(labels)
+                target[labels] = metric.merge(target.get(labels), value)
+        return merged
+
+    def _retire(self, conn, rows):
+        """Fold the snapshots of stopped workers into the retained row"""
+        if not rows:
+            return
+        pids = [row['pid'] for row in rows] + [RETIRED_PID]
+        marks = ','.join('?' * len(pids))
+        retired = {}
+        for row in conn.execute(f"SELECT data FROM metrics_snapshots WHERE pid IN ({marks})", pids):
+            self._add_up(retired, json.loads(row['data']))
+        data = {name: [[list(labels), value] for labels, value in values.items()] for name, values in retired.items()}
+        conn.execute(f"DELETE FROM metrics_snapshots WHERE pid IN ({marks})", pids)
+        conn.execute(
+            "INSERT INTO metrics_snapshots (pid, data, updated_at) VALUES (?, ?, ?)",
+            (RETIRED_PID, json.dumps(data), time.time())
+        )
+
+    def _merged(self):
+        """{metric name: {label tuple: value}} summed over all workers, past and present"""
+        self.publish()
+        conn = get_connection(self.path)
+        with transaction(conn):
+            stale = conn.execute(
+                "SELECT pid FROM metrics_snapshots WHERE pid != ? AND updated_at < ?",
+                (RETIRED_PID, time.time() - STALE_SECONDS)
+            ).fetchall()
+            self._retire(conn, stale)
+        merged = {}
+        for row in conn.execute("SELECT data FROM metrics_snapshots"):
+            self._add_up(merged, json.loads(row['data']))
+        return merged
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        merged = self._merged()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if metric.kind == 'gauge':
+                try:
+                    values = metric.read()
+                except Exception as e:
+                    print(f"Error reading gauge {metric.name}: {e}")
+                    continue
+                if not isinstance(values, dict):
+                    values = {(): values}
+            else:
+                values = merged.get(metric.name, {})
+            for labels, value in sorted(values.items()):
+                for name, sample_labels, sample in self._samples(metric, list(zip(metric.labels, labels)), value):
+                    lines.append(_line(name, sample_labels, sample))
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _samples(metric, labels, value):
+        if metric.kind == 'gauge':
+            return [(metric.name, labels, value)]
+        return metric.samples(labels, value)
@@ -0,0 +1,189 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from http_client import session, MISTRAL_TIMEOUT
+
+# Cached replies: how many, and for how long (seconds)
+CACHE_SIZE = int(os.environ.get('MISTRAL_CACHE_SIZE', 2048))
+CACHE_TTL = float(os.environ.get('MISTRAL_CACHE_TTL', 3600))
+
+# Rough token budget for the conversation history sent with each message
+CONTEXT_TOKENS = int(os.environ.get('MISTRAL_CONTEXT_TOKENS', 800))
+
+# Per-message overhead (role, separators) in the token estimate
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# A conversation's state keeps this many budgets of raw turns; what doesn't fit in
+# the budget sent is summarised afresh for each call
+STORED_CONTEXT_FACTOR = 4
+
+SUMMARY_PREFIX = "Earlier the candidate said: "
+
+_NOT_WORD = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_message(text):
+    """Lower-case, punctuation-free, single-spaced text: "Salary kitni hai??" -> "salary kitni hai\""""
+    return _SPACES.sub(' ', _NOT_WORD.sub(' ', (text or '').lower())).strip()
+
+
+def estimate_tokens(text):
+    """About 4 characters per token, which is close enough for budgeting"""
+    return len(text or '') // 4 + 1
+
+
+def without_summaries(history):
+    """The conversation turns only, without summaries stored by older versions"""
+    return [
+        m for m in history
+        if m.get('role') != 'system' and not (m.get('content') or '').startswith(SUMMARY_PREFIX)
+    ]
+
+
+def trim_history(history, budget=CONTEXT_TOKENS, summarize=True):
+    """Keep the most recent messages that fit in `budget` tokens.
+
+    The messages that no longer fit are folded into one short system message
+    at the front (what the candidate said earlier, clipped), so the model keeps
+    the gist of a long conversation at a fraction of its tokens. Without
+    `summarize` they are just dropped, which is what gets stored.
+    """
+    history = without_summaries(history)
+    kept, used = [], 0
+    for message in reversed(history):
+        cost = estimate_tokens(message.get('content')) + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    dropped = history[:len(history) - len(kept)]
+    said = [m.get('content') or '' for m in dropped if m.get('role') == 'user']
+    if not said or not summarize:
+        return kept
+
+    # Summary gets what is left of the budget, at least a few dozen tokens
+    room = max((budget - used) * 4, 160)
+    parts = []
+    for text in reversed(said):
+        clipped = text if len(text) <= 60 else text[:57] + '...'
+        if sum(len(p) + 3 for p in parts) + len(clipped) > room:
+            break
+        parts.append(clipped)
+    if not parts:
+        return kept
+    summary = SUMMARY_PREFIX + " | ".join(reversed(parts))
+    # Drop the oldest kept message if the summary pushed us over
+    while kept and used + estimate_tokens(summary) + MESSAGE_OVERHEAD_TOKENS > budget:
+        used -= estimate_tokens(kept[0].get('content')) + MESSAGE_OVERHEAD_TOKENS
+        kept = kept[1:]
+    return [{"role": "system", "content": summary}] + kept
+
+
+class ReplyCache:
+    """Thread-safe LRU of replies with a time-to-live"""
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            reply, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return reply
+
+    def put(self, key, reply):
+        with self._lock:
+            self._entries[key] = (reply, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MistralClient:
+    """Calls the mistral-chat edge function with caching, coalescing and a context budget.
+
+    Replies are cached per (context, normalized message), where the context is
+    what the reply depends on beyond the message itself (job profile, flow step
+    and the question the bot asked last). Identical requests that arrive while
+    one is already on its way wait for that one instead of calling the model
+    again. Failed calls are neither cached nor shared beyond their waiters.
+    """
+
+    def __init__(self, url, cache=None, context_tokens=CONTEXT_TOKENS):
+        self.url = url
+        self.cache = cache or ReplyCache()
+        self.context_tokens = context_tokens
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = 0
+
+    def reply(self, sender, message, history, context=()):
+        """The model's reply to `message`; `history` excludes the message itself"""
+        key = (tuple(context), normalize_message(message))
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            self.coalesced += 1
+            return future.result()
+
+        self.misses += 1
+        try:
+            reply = self._call(sender, message, history)
+            if reply:
+                self.cache.put(key, reply)
+            future.set_result(reply)
+            return reply
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _call(self, sender, message, history):
+        response = session().post(
+            self.url,
+            json={
+                "message": message,
+                "sender": sender,
+                "conversationHistory": trim_history(history, self.context_tokens)
+            },
+            timeout=MISTRAL_TIMEOUT
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Error from Mistral edge function: {response.text}")
+        return response.json().get('reply')
+
+    def stats(self):
+        return {
+            "cache_size": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced
+        }
@@ -0,0 +1,183 @@
+import json
+import time
+import random
+import threading
+
+from db import get_connection, transaction
+
+# Items claimed by a worker are invisible to other workers for this long
+CLAIM_SECONDS = 60
+
+
+class Outbox:
+    """Durable queue of side effects (candidate sync, admin notifications).
+
+    Items are written to SQLite before the reply goes out, so nothing is lost
+    if the Node server is down or this process restarts. A worker thread per
+    process claims due items in batches per kind, hands each batch to that
+    kind's handler and retries failures with exponential backoff and jitter.
+    A failed batch pushes the whole batch back, so a recovering downstream
+    sees a trickle of retries instead of the full burst at once.
+
+    Handlers take a list of payloads and return a list of booleans (one per
+    payload, True when delivered); raising fails the whole batch. A handler
+    registered with ids=True also gets the items' outbox ids, which stay the
+    same across retries so the receiver can drop an item it already delivered.
+    """
+
+    def __init__(self, path=None, batch_size=50, base_delay=2.0, max_delay=600.0, max_attempts=20, poll_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.handlers = {}
+        self._batch_sizes = {}
+        self._pass_ids = set()
+        self._wakeup = threading.Event()
+        self._started = False
+        self._start_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS outbox (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   kind TEXT NOT NULL,
+                   payload TEXT NOT NULL,
+                   status TEXT NOT NULL DEFAULT 'pending',
+                   attempts INTEGER NOT NULL DEFAULT 0,
+                   next_attempt_at REAL NOT NULL,
+                   claimed_until REAL NOT NULL DEFAULT 0,
+                   last_error TEXT,
+                   created_at REAL NOT NULL
+               )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, kind, next_attempt_at)")
+
+    def _conn(self):
+        return get_connection(self.path)
+
+    def register(self, kind, handler, batch_size=None, ids=False):
+        """Deliver items of this kind with handler, at most batch_size (default: the outbox's) at a time"""
+        self.handlers[kind] = handler
+        self._batch_sizes[kind] = batch_size or self.batch_size
+        if ids:
+            self._pass_ids.add(kind)
+
+    def enqueue(self, kind, payload):
+        """Record a side effect durably and wake the worker"""
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO outbox (kind, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+            (kind, json.dumps(payload), now, now)
+        )
+        self.start()
+        self._wakeup.set()
+
+    def enqueue_many(self, kind, payloads):
+        """enqueue() for many side effects, written in one transaction"""
+        if not payloads:
+            return
+        now = time.time()
+        conn = self._conn()
+        with transaction(conn):
+            conn.executemany(
+                "INSERT INTO outbox (kind, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                [(kind, json.dumps(payload), now, now) for payload in payloads]
+            )
+        self.start()
+        self._wakeup.set()
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            threading.Thread(target=self._run, name='outbox', daemon=True).start()
+            self._started = True
+
+    def stats(self):
+        """Queue depth per kind, dead items and the age of the oldest pending item"""
+        conn = self._conn()
+        pending = {
+            row['kind']: row['n'] for row in conn.execute(
+                "SELECT kind, COUNT(*) AS n FROM outbox WHERE status = 'pending' GROUP BY kind"
+            )
+        }
+        oldest = conn.execute("SELECT MIN(created_at) FROM outbox WHERE status = 'pending'").fetchone()[0]
+        dead = conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'dead'").fetchone()[0]
+        return {
+            "pending": sum(pending.values()),
+            "pending_by_kind": pending,
+            "dead": dead,
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else 0
+        }
+
+    def _claim(self, kind):
+        conn = self._conn()
+        now = time.time()
+        with transaction(conn):
+            rows = conn.execute(
+                """SELECT id, payload, attempts FROM outbox
+                   WHERE status = 'pending' AND kind = ? AND next_attempt_at <= ? AND claimed_until < ?
+                   ORDER BY id LIMIT ?""",
+                (kind, now, now, self._batch_sizes.get(kind, self.batch_size))
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET claimed_until = ? WHERE id = ?",
+                [(now + CLAIM_SECONDS, row['id']) for row in rows]
+            )
+        return rows
+
+    def _finish(self, rows, delivered, error):
+        conn = self._conn()
+        now = time.time()
+        with transaction(conn):
+            for row, ok in zip(rows, delivered):
+                if ok:
+                    conn.execute("DELETE FROM outbox WHERE id = ?", (row['id'],))
+                    continue
+                attempts = row['attempts'] + 1
+                delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+                delay *= random.uniform(0.8, 1.2)
+                conn.execute(
+                    """UPDATE outbox SET attempts = ?, next_attempt_at = ?, claimed_until = 0, last_error = ?,
+                       status = ? WHERE id = ?""",
+                    (attempts, now + delay, error, 'dead' if attempts >= self.max_attempts else 'pending', row['id'])
+                )
+
+    def process_due(self):
+        """Deliver every batch that is due now; returns the number of items handled"""
+        handled = 0
+        for kind, handler in self.handlers.items():
+            while True:
+                rows = self._claim(kind)
+                if not rows:
+                    break
+                payloads = [json.loads(row['payload']) for row in rows]
+                try:
+                    if kind in self._pass_ids:
+                        delivered = list(handler(payloads, [row['id'] for row in rows]))
+                    else:
+                        delivered = list(handler(payloads))
+                    if len(delivered) != len(rows):
+                        raise ValueError(f"handler returned {len(delivered)} results for {len(rows)} items")
+                    error = None if all(delivered) else "rejected by downstream"
+                except Exception as e:
+                    delivered, error = [False] * len(rows), str(e)
+                    print(f"Error delivering {len(rows)} {kind} item(s), will retry: {e}")
+                self._finish(rows, delivered, error)
+                handled += len(rows)
+                if not all(delivered):
+                    # Back off this kind until its next attempt is due
+                    break
+        return handled
+
+    def _run(self):
+        while True:
+            try:
+                self.process_due()
+            except Exception as e:
+                print(f"Error in outbox worker: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
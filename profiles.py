@@ -0,0 +1,227 @@
+import os
+import copy
+import json
+import time
+import threading
+
+from db import get_connection, transaction
+from config import ConfigManager, DATA_FILE, FAQ_FILE, FAQ_SYNONYMS_FILE, CHECK_INTERVAL
+
+PROFILES_DIR = os.environ.get('PROFILES_DIR', 'profiles')
+PROFILE_FILE = 'profile.json'
+
+# The flow, FAQs and criteria at the top of the repo: what ran before profiles existed
+DEFAULT_PROFILE = 'default'
+
+
+def state_key(profile_id, sender):
+    """Conversation state key: the plain sender for the default profile (as before), sender#profile otherwise"""
+    return sender if profile_id == DEFAULT_PROFILE else f"{sender}#{profile_id}"
+
+
+def split_state_key(key):
+    """(profile_id, sender) for a state key"""
+    sender, _, profile_id = key.partition('#')
+    return profile_id or DEFAULT_PROFILE, sender
+
+
+class Profile:
+    """One job opening: its compiled flow and FAQs, qualification criteria and admin"""
+
+    def __init__(self, profile_id, title, criteria, admin, files, on_reload=None):
+        self.id = profile_id
+        self.title = title
+        self.criteria = criteria
+        self.admin = admin
+        self.config = ConfigManager(*files, on_reload=on_reload)
+
+    def describe(self):
+        config = self.config.current()
+        return {
+            "id": self.id,
+            "title": self.title,
+            "admin": self.admin,
+            "criteria": self.criteria,
+            "steps": config.step_order,
+            "faqs": len(config.faq_responses)
+        }
+
+
+class ProfileRegistry:
+    """All job profiles this process serves, and which profile each sender is talking to.
+
+    The default profile is the flow in data.csv/faq.csv with the default
+    criteria and admin. Every directory under PROFILES_DIR that has a data.csv
+    adds a profile named after the directory; its faq.csv, faq_synonyms.csv and
+    profile.json ({"title", "admin", "criteria"}) are optional, and criteria
+    not given there fall back to the defaults. Profiles are compiled on first
+    use and then shared by every conversation they run, so an idle profile
+    costs nothing and a busy one is held in memory once.
+
+    Criteria changed through update_criteria() are saved in bot.db and
+    applied on top; every worker checks for changes at most every
+    CHECK_INTERVAL seconds, when it next looks up a profile.
+    """
+
+    def __init__(self, default_criteria, default_admin, directory=PROFILES_DIR, path=None, on_default_reload=None):
+        self.default_criteria = default_criteria
+        self.default_admin = default_admin
+        self.directory = directory
+        self.path = path
+        self.on_default_reload = on_default_reload
+        self._lock = threading.Lock()
+        self._profiles = {}
+        self._available = set()
+        self._criteria_version = None
+        self._criteria_checked_at = time.monotonic()
+        self.scan()
+
+        self._conn().execute(
+            """CREATE TABLE IF NOT EXISTS sender_profiles (
+                   sender TEXT PRIMARY KEY,
+                   profile TEXT NOT NULL,
+                   assigned_at REAL NOT NULL
+               )"""
+        )
+        self._conn().execute(
+            """CREATE TABLE IF NOT EXISTS profile_criteria (
+                   profile TEXT PRIMARY KEY,
+                   criteria TEXT NOT NULL,
+                   updated_at REAL NOT NULL
+               )"""
+        )
+
+    def _conn(self):
+        return get_connection(self.path)
+
+    def scan(self):
+        """Pick up profile directories added or removed since the last scan"""
+        available = {DEFAULT_PROFILE}
+        if os.path.isdir(self.directory):
+            available.update(name for name in os.listdir(self.directory) if self._is_profile_dir(name))
+        with self._lock:
+            self._available = available
+            for profile_id in list(self._profiles):
+                if profile_id not in available:
+                    del self._profiles[profile_id]
+        return sorted(available)
+
+    def _is_profile_dir(self, name):
+        """Whether PROFILES_DIR/<name> is a profile (a plain directory name with a data.csv)"""
+        return (
+            name != DEFAULT_PROFILE and '#' not in name and not name.startswith('.') and
+            name == os.path.basename(name) and os.path.exists(os.path.join(self.directory, name, DATA_FILE))
+        )
+
+    def _known(self, profile_id):
+        """Whether a profile exists, looking on disk for one this worker hasn't scanned yet
+        (added after its last scan, and scanned or assigned by another worker)"""
+        if profile_id in self._available:
+            return True
+        if not self._is_profile_dir(profile_id):
+            return False
+        with self._lock:
+            self._available = self._available | {profile_id}
+        return True
+
+    def _build(self, profile_id):
+        profile = self._build_from_files(profile_id)
+        row = self._conn().execute("SELECT criteria FROM profile_criteria WHERE profile = ?", (profile_id,)).fetchone()
+        if row:
+            profile.criteria.update(json.loads(row['criteria']))
+        return profile
+
+    def _build_from_files(self, profile_id):
+        if profile_id == DEFAULT_PROFILE:
+            return Profile(
+                DEFAULT_PROFILE, "Default", self.default_criteria, self.default_admin,
+                (DATA_FILE, FAQ_FILE, FAQ_SYNONYMS_FILE), on_reload=self.on_default_reload
+            )
+        base = os.path.join(self.directory, profile_id)
+        settings = {}
+        settings_file = os.path.join(base, PROFILE_FILE)
+        if os.path.exists(settings_file):
+            with open(settings_file, encoding='utf-8') as f:
+                settings = json.load(f)
+        criteria = copy.deepcopy(self.default_criteria)
+        criteria.update(settings.get('criteria') or {})
+        return Profile(
+            profile_id, settings.get('title') or profile_id, criteria, settings.get('admin') or self.default_admin,
+            tuple(os.path.join(base, name) for name in (DATA_FILE, FAQ_FILE, FAQ_SYNONYMS_FILE))
+        )
+
+    def get(self, profile_id=None):
+        """The profile with this ID (the default one for None); raises KeyError for an unknown ID"""
+        profile_id = profile_id or DEFAULT_PROFILE
+        self._refresh_criteria()
+        profile = self._profiles.get(profile_id)
+        if profile is not None:
+            return profile
+        if not self._known(profile_id):
+            raise KeyError(profile_id)
+        with self._lock:
+            profile = self._profiles.get(profile_id)
+            if profile is None:
+                profile = self._profiles[profile_id] = self._build(profile_id)
+        return profile
+
+    def update_criteria(self, profile_id, changes):
+        """Change a profile's criteria in every worker: applied here now, and by the
+        others within CHECK_INTERVAL; returns the profile's criteria"""
+        profile = self.get(profile_id)
+        conn = self._conn()
+        with transaction(conn):
+            row = conn.execute("SELECT criteria FROM profile_criteria WHERE profile = ?", (profile.id,)).fetchone()
+            stored = json.loads(row['criteria']) if row else {}
+            stored.update(changes)
+            conn.execute(
+                """INSERT INTO profile_criteria (profile, criteria, updated_at) VALUES (?, ?, ?)
+                   ON CONFLICT(profile) DO UPDATE SET criteria = excluded.criteria, updated_at = excluded.updated_at""",
+                (profile.id, json.dumps(stored), time.time())
+            )
+        profile.criteria.update(changes)
+        return profile.criteria
+
+    def _refresh_criteria(self):
+        """Apply criteria other workers saved since the last check (at most every CHECK_INTERVAL)"""
+        if time.monotonic() - self._criteria_checked_at < CHECK_INTERVAL:
+            return
+        with self._lock:
+            if time.monotonic() - self._criteria_checked_at < CHECK_INTERVAL:
+                return
+            self._criteria_checked_at = time.monotonic()
+            conn = self._conn()
+            version = tuple(conn.execute("SELECT COUNT(*), MAX(updated_at) FROM profile_criteria").fetchone())
+            if version == self._criteria_version:
+                return
+            self._criteria_version = version
+            for row in conn.execute("SELECT profile, criteria FROM profile_criteria"):
+                profile = self._profiles.get(row['profile'])
+                if profile is not None:
+                    profile.criteria.update(json.loads(row['criteria']))
+
+    def loaded(self):
+        return list(self._profiles.values())
+
+    def assign(self, senders, profile_id):
+        """Route these senders' next messages to a profile (e.g. when a campaign texts them)"""
+        self.get(profile_id)
+        now = time.time()
+        conn = self._conn()
+        with transaction(conn):
+            conn.executemany(
+                """INSERT INTO sender_profiles (sender, profile, assigned_at) VALUES (?, ?, ?)
+                   ON CONFLICT(sender) DO UPDATE SET profile = excluded.profile, assigned_at = excluded.assigned_at""",
+                [(sender, profile_id, now) for sender in senders]
+            )
+
+    def profile_for(self, sender):
+        """The profile a sender was last routed to; the default profile when there is none,
+        or when their profile's directory has been removed"""
+        row = self._conn().execute("SELECT profile FROM sender_profiles WHERE sender = ?", (sender,)).fetchone()
+        if row is None:
+            return DEFAULT_PROFILE
+        if not self._known(row['profile']):
+            print(f"Profile {row['profile']!r} of {sender} no longer exists; using the default profile")
+            return DEFAULT_PROFILE
+        return row['profile']
@@ -0,0 +1,76 @@
+from extractors import parse_ctc_lpa, parse_experience_years, parse_notice_days
+
+# Stored for a step the candidate was never asked (see app.candidate_fields)
+UNANSWERED = 'Unknown'
+
+
+def _answer(answers, key, default):
+    value = answers.get(key)
+    if value is None or value == UNANSWERED or (isinstance(value, str) and not value.strip()):
+        return default
+    return value
+
+
+def parse_answers(answers, parsed=None):
+    """Typed fields for qualification from a candidate's answers.
+
+    Returns {'experience_years', 'ctc_lpa', 'notice_days'}; a field
+    that cannot be read is None, which never qualifies. Fields already in
+    `parsed` (extracted when the conversation captured the answer) are used
+    as they are. A missing notice answer (or the UNANSWERED placeholder)
+    means 0 days: unemployed candidates are never asked.
+    """
+    parsed = parsed or {}
+    typed = {}
+    for field, key, parser, default in (
+        ('experience_years', 'experience', parse_experience_years, '0'),
+        ('ctc_lpa', 'ctc', parse_ctc_lpa, '0'),
+        ('notice_days', 'notice', parse_notice_days, '0'),
+    ):
+        typed[field] = parsed[field] if field in parsed else parser(_answer(answers, key, default))
+    return typed
+
+
+def product_matches(product, criteria):
+    return any(p in (product or '').lower() for p in criteria['allowed_products'])
+
+
+def meets_criteria(parsed, product, criteria):
+    """Whether one candidate's parsed fields and product meet the criteria"""
+    experience, ctc, notice = parsed['experience_years'], parsed['ctc_lpa'], parsed['notice_days']
+    if experience is None or ctc is None or notice is None:
+        return False
+    return (
+        experience >= criteria['min_experience'] and
+        criteria['min_ctc'] <= ctc <= criteria['max_ctc'] and
+        notice <= criteria['notice_period_max'] and
+        product_matches(product, criteria)
+    )
+
+
+def qualify_many(experience_years, ctc_lpa, notice_days, products, criteria):
+    """meets_criteria() for whole columns at once; returns a NumPy bool array.
+
+    Numbers are compared as arrays (None becomes NaN, which fails every
+    comparison). Products repeat a lot, so each distinct product is matched
+    once and the result is spread back over the rows.
+    """
+    import numpy as np
+
+    experience = np.array(experience_years, dtype=float)
+    ctc = np.array(ctc_lpa, dtype=float)
+    notice = np.array(notice_days, dtype=float)
+
+    codes = {}
+    product_codes = np.fromiter(
+        (codes.setdefault(p, len(codes)) for p in products), dtype=np.int64, count=len(products)
+    )
+    distinct_matches = np.array([product_matches(p, criteria) for p in codes], dtype=bool)
+    product_ok = distinct_matches[product_codes] if codes else np.zeros(0, dtype=bool)
+
+    return (
+        (experience >= criteria['min_experience']) &
+        (ctc >= criteria['min_ctc']) & (ctc <= criteria['max_ctc']) &
+        (notice <= criteria['notice_period_max']) &
+        product_ok
+    )
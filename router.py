@@ -0,0 +1,186 @@
+import os
+import re
+import time
+import threading
+from collections import Counter, deque
+
+from db import get_connection, transaction
+
+# Messages scored below this go to Mistral (when USE_MISTRAL=true); above 1 sends everything
+ROUTER_THRESHOLD = float(os.environ.get('ROUTER_THRESHOLD', 0.6))
+
+# Recorded decisions are kept this long (seconds; 0 keeps them forever)
+ROUTER_LOG_TTL = float(os.environ.get('ROUTER_LOG_TTL', 7 * 24 * 3600))
+
+# How often old decisions are pruned, and how many rows are deleted per transaction
+PRUNE_INTERVAL = 60
+PRUNE_BATCH = 1000
+
+RULES = 'rules'
+LLM = 'llm'
+
+QUESTION_WORDS = re.compile(
+    r'^(what|why|how|when|where|which|who|whom|is|are|can|could|will|do|does|'
+    r'kya|kyu|kyun|kaise|kahan|kaha|kab|kaun|kaunsa|kaunsi|kitna|kitni|kitne)\b'
+)
+AMOUNT = re.compile(r'\d+\.?\d*\s*(lpa|l|lakhs?|k|rs|inr)?')
+
+# What an answer to each built-in step usually looks like
+STEP_ANSWERS = {
+    'notice': re.compile(r'\d|immediate|serving|join|month|week|day'),
+    'experience': re.compile(r'\d|year|yr|saal|month'),
+    'ctc': AMOUNT,
+}
+
+
+class RouteDecision:
+    def __init__(self, route, confidence, reason):
+        self.route = route
+        self.confidence = confidence
+        self.reason = reason
+
+
+def is_question(message):
+    text = message.lower().strip()
+    return '?' in text or bool(QUESTION_WORDS.match(text))
+
+
+def rule_confidence(message, step, flags, signals, faq_matched, step_matched):
+    """How sure the rule engine can be that it handles this message well, 0..1, and why.
+
+    Keyword signals, blocked conversations and FAQ hits are certain. Otherwise
+    it depends on whether the message looks like an answer to the current step
+    or like a question the FAQs don't cover.
+    """
+    if signals & {'not_interested', 'fresher'}:
+        return 1.0, 'keyword'
+    if flags.get('blocked'):
+        return 1.0, 'blocked'
+    if 'ctc' in signals and AMOUNT.search(message.lower()):
+        return 1.0, 'keyword'
+    if faq_matched:
+        return 0.9, 'faq'
+    if is_question(message):
+        return 0.2, 'question'
+    if step == 'interest':
+        if 'interest' in signals or step_matched:
+            return 0.95, 'step_answer'
+        return 0.3, 'step_mismatch'
+    pattern = STEP_ANSWERS.get(step)
+    if pattern is not None:
+        if pattern.search(message.lower()):
+            return 0.9, 'step_answer'
+        return 0.4, 'step_mismatch'
+    # Free-text steps (company, product, cv, ...): anything that isn't a question will do
+    return 0.75, 'free_text'
+
+
+class HybridRouter:
+    """Sends a message to the rule engine or to Mistral by the rule engine's confidence.
+
+    Every decision is counted in memory (for /router/stats) and written to the
+    routing_decisions table in the background, in batches, so the threshold can
+    be tuned from real traffic without slowing down replies. The same thread
+    drops decisions older than `ttl`.
+    """
+
+    def __init__(self, threshold=ROUTER_THRESHOLD, path=None, flush_interval=2.0, ttl=ROUTER_LOG_TTL):
+        self.threshold = threshold
+        self.path = path
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self._pruned_at = 0.0
+        self.counts = Counter()
+        self._pending = deque()
+        self._started = False
+        self._lock = threading.Lock()
+        get_connection(path).execute(
+            """CREATE TABLE IF NOT EXISTS routing_decisions (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   at REAL NOT NULL,
+                   profile TEXT,
+                   step TEXT,
+                   route TEXT NOT NULL,
+                   confidence REAL NOT NULL,
+                   reason TEXT NOT NULL,
+                   threshold REAL NOT NULL
+               )"""
+        )
+        get_connection(path).execute("CREATE INDEX IF NOT EXISTS idx_routing_decisions_at ON routing_decisions (at)")
+
+    def decide(self, message, step, flags, signals, faq_matched, step_matched):
+        confidence, reason = rule_confidence(message, step, flags, signals, faq_matched, step_matched)
+        route = RULES if confidence >= self.threshold else LLM
+        return RouteDecision(route, confidence, reason)
+
+    def record(self, decision, profile_id, step):
+        self.counts[decision.route, decision.reason] += 1
+        self._pending.append(
+            (time.time(), profile_id, step, decision.route, decision.confidence, decision.reason, self.threshold)
+        )
+        if not self._started:
+            with self._lock:
+                if not self._started:
+                    threading.Thread(target=self._run, name='router-log', daemon=True).start()
+                    self._started = True
+
+    def flush(self):
+        rows = []
+        while self._pending:
+            rows.append(self._pending.popleft())
+        if not rows:
+            return
+        conn = get_connection(self.path)
+        with transaction(conn):
+            conn.executemany(
+                """INSERT INTO routing_decisions (at, profile, step, route, confidence, reason, threshold)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+
+    def prune(self, now=None):
+        """Delete decisions older than the TTL, a batch per transaction; returns how many"""
+        now = now or time.time()
+        self._pruned_at = now
+        if not self.ttl:
+            return 0
+        conn = get_connection(self.path)
+        deleted = 0
+        while True:
+            with transaction(conn):
+                n = conn.execute(
+                    """DELETE FROM routing_decisions WHERE id IN (
+                           SELECT id FROM routing_decisions WHERE at < ? LIMIT ?)""",
+                    (now - self.ttl, PRUNE_BATCH)
+                ).rowcount
+            deleted += n
+            if n < PRUNE_BATCH:
+                return deleted
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+                if time.time() - self._pruned_at >= PRUNE_INTERVAL:
+                    self.prune()
+            except Exception as e:
+                print(f"Error writing routing decisions: {e}")
+
+    def stats(self):
+        """Decisions in this process by route and reason, and the recorded confidence spread"""
+        self.flush()
+        by_bucket = {
+            f"{row[0]:.1f}": {"rules": row[1], "llm": row[2]}
+            for row in get_connection(self.path).execute(
+                """SELECT ROUND(confidence, 1) AS bucket, SUM(route = 'rules'), SUM(route = 'llm')
+                   FROM routing_decisions GROUP BY bucket ORDER BY bucket"""
+            )
+        }
+        return {
+            "threshold": self.threshold,
+            "this_process": [
+                {"route": route, "reason": reason, "count": n} for (route, reason), n in self.counts.most_common()
+            ],
+            "recorded_by_confidence": by_bucket
+        }
@@ -174,11 +174,6 @@ const startPythonServer = async () => {
     console.log(`Initial Python server status: ${serverStatus.pythonServer ? 'running' : 'not running'}`);
 })();
 
-// Create candidates.json if it doesn't exist
-if (!fs.existsSync('candidates.json')) {
-  fs.writeFileSync('candidates.json', JSON.stringify([], null, 2));
-}
-
 // Toggle Mistral AI usage
 app.post('/toggle-mistral', (req, res) => {
   const { enabled } = req.body;
@@ -207,46 +202,39 @@ app.get('/mistral-status', (req, res) => {
   });
 });
 
-// Get candidates list
-app.get('/candidates', (req, res) => {
+// Get candidates list (candidates are stored by the Python server)
+app.get('/candidates', async (req, res) => {
   try {
-    if (fs.existsSync('candidates.json')) {
-      const candidates = JSON.parse(fs.readFileSync('candidates.json', 'utf-8'));
-      res.json(candidates);
-    } else {
-      res.json([]);
-    }
+    const response = await axios.get('http://localhost:5000/candidates');
+    res.json(response.data);
   } catch (error) {
-    console.error('Error reading candidates:', error);
+    console.error('Error reading candidates:', error.message);
     res.json([]);
   }
 });
 
-// Get conversations endpoint
-app.get('/conversations', (req, res) => {
+// Get conversations endpoint (conversation state lives in the Python server)
+app.get('/conversations', async (req, res) => {
   try {
-    if (fs.existsSync('state.json')) {
-      const state = JSON.parse(fs.readFileSync('state.json', 'utf-8'));
-      const conversations = Object.keys(state).map(id => {
-        const user = state[id];
-        return {
-          id,
-          phoneNumber: id.split('@')[0],
-          lastMessage: user.answers ? Object.values(user.answers).pop() || "Started conversation" : "Started conversation",
-          timestamp: new Date().toISOString(),
-          status: "active"
-        };
-      });
-      res.json(conversations);
-    } else {
-      res.json([]);
-    }
+    const response = await axios.get('http://localhost:5000/conversations');
+    res.json(response.data);
   } catch (error) {
-    console.error('Error reading conversations:', error);
+    console.error('Error reading conversations:', error.message);
     res.json([]);
   }
 });
 
+// Chat log of one candidate for BotLogsPage (logs live in the Python server)
+app.get('/conversation/:phone', async (req, res) => {
+  try {
+    const response = await axios.get(`http://localhost:5000/chatlogs/${encodeURIComponent(req.params.phone)}`);
+    res.json(response.data);
+  } catch (error) {
+    console.error('Error reading chat log:', error.message);
+    res.json({ flow: [] });
+  }
+});
+
 // Handle socket connections
 io.on('connection', (socket) => {
     console.log('New client connected');
@@ -316,6 +304,13 @@ client.on('ready', async () => {
     isConnected = true;
     io.emit('connectionStatus', { isConnected: true });
 
+    // Answer whatever candidates sent while we were offline before new outreach
+    try {
+        await drainUnreadMessages();
+    } catch (err) {
+        console.error('Error replaying queued messages:', err.message);
+    }
+
     // Load start messages if file exists
     let startMessages = [];
     try {
@@ -332,23 +327,25 @@ client.on('ready', async () => {
             ];
         }
 
-        // Check if numbers.txt exists
+        // Queue numbers.txt as a campaign in the Python server, which paces the
+        // outreach and sends each message back through /notify. Numbers already
+        // queued or texted are skipped, so reconnecting never starts over.
         if (fs.existsSync('numbers.txt')) {
             const numbers = fs.readFileSync('numbers.txt', 'utf-8')
                 .split('\n')
                 .map(n => n.trim())
                 .filter(n => n.length > 0);
 
-            for (const number of numbers) {
-                const chatId = number.includes('@c.us') ? number : `${number}@c.us`;
-                for (const msg of startMessages) {
-                    await client.sendMessage(chatId, msg);
-                    await new Promise(r => setTimeout(r, 1000));
-                }
-            }
+            const response = await axios.post('http://localhost:5000/campaigns', {
+                name: 'numbers.txt',
+                numbers,
+                messages: startMessages
+            });
+            const { campaign } = response.data;
+            console.log(`Campaign ${campaign.name}: ${campaign.pending} to text, ${campaign.sent} done, ${campaign.skipped} skipped`);
         }
     } catch (err) {
-        console.error('Error sending initial messages:', err);
+        console.error('Error queueing initial messages:', err.message);
     }
 });
 
@@ -358,6 +355,53 @@ client.on('authenticated', () => {
     io.emit('authenticated');
 });
 
+// Send the Python bot's reply for a sender (or notify admin when the flow is complete)
+const deliverReply = async (sender, reply, msg = null) => {
+    // If Python bot signals end of flow, notify admin
+    if (reply === "__COMPLETE__") {
+        const userNumber = sender.split('@')[0];
+        await client.sendMessage(ADMIN_NUMBER, `✅ Info collected from user: ${userNumber}`);
+        return; // do NOT reply to user
+    }
+
+    if (msg) {
+        await msg.reply(reply);
+    } else {
+        await client.sendMessage(sender, reply);
+    }
+};
+
+// Replay messages that arrived while the bot was disconnected in a few /ask-batch calls
+const ASK_BATCH_SIZE = 200;
+const drainUnreadMessages = async () => {
+    const queued = [];
+    const chats = await client.getChats();
+    for (const chat of chats) {
+        if (chat.isGroup || chat.unreadCount === 0) continue;
+        const messages = await chat.fetchMessages({ limit: chat.unreadCount });
+        for (const m of messages) {
+            if (!m.fromMe && m.body) {
+                queued.push({ sender: m.from, message: m.body });
+            }
+        }
+        await chat.sendSeen();
+    }
+    if (queued.length === 0) return;
+
+    console.log(`Replaying ${queued.length} queued messages`);
+    // Batches go out one after another, so each sender's messages stay in order
+    for (let i = 0; i < queued.length; i += ASK_BATCH_SIZE) {
+        const response = await axios.post('http://localhost:5000/ask-batch', {
+            messages: queued.slice(i, i + ASK_BATCH_SIZE)
+        });
+        for (const item of response.data.replies || []) {
+            if (item && item.reply) {
+                await deliverReply(item.sender, item.reply);
+            }
+        }
+    }
+};
+
 // Handle incoming user message
 client.on('message', async msg => {
     const userMessage = msg.body;
@@ -370,16 +414,7 @@ client.on('message', async msg => {
         });
 
         if (response.data && response.data.reply) {
-            const reply = response.data.reply;
-
-            // If Python bot signals end of flow (reply is null), notify admin
-            if (reply === "__COMPLETE__") {
-                const userNumber = sender.split('@')[0];
-                await client.sendMessage(ADMIN_NUMBER, `✅ Info collected from user: ${userNumber}`);
-                return; // do NOT reply to user
-            }
-
-            await msg.reply(reply);
+            await deliverReply(sender, response.data.reply, msg);
         }
     } catch (err) {
         console.error('❌ Error from Python bot:', err.message);
@@ -388,18 +423,24 @@ client.on('message', async msg => {
     }
 });
 
+// Outreach campaigns and their progress (the queue lives in the Python server)
+app.get('/campaigns', async (req, res) => {
+    try {
+        const response = await axios.get('http://localhost:5000/campaigns');
+        res.json(response.data);
+    } catch (error) {
+        console.error('Error reading campaigns:', error.message);
+        res.json([]);
+    }
+});
+
 // Get active chat count
-app.get('/active-chats', (req, res) => {
+app.get('/active-chats', async (req, res) => {
     try {
-        if (fs.existsSync('state.json')) {
-            const state = JSON.parse(fs.readFileSync('state.json', 'utf-8'));
-            const activeChatsCount = Object.keys(state).length;
-            res.json({ count: activeChatsCount });
-        } else {
-            res.json({ count: 0 });
-        }
+        const response = await axios.get('http://localhost:5000/active-chats');
+        res.json(response.data);
     } catch (error) {
-        console.error('Error reading active chats:', error);
+        console.error('Error reading active chats:', error.message);
         res.json({ count: 0 });
     }
 });
@@ -417,6 +458,44 @@ app.post('/notify', async (req, res) => {
     }
 });
 
+// Outbox ids of recently sent (or sending) notifications, so a batch retried after
+// a timeout doesn't send them twice; the oldest are forgotten first
+const recentNotifications = new Map();
+const RECENT_NOTIFICATIONS_MAX = 5000;
+
+function sendNotificationOnce(id, to, message) {
+    if (id != null && recentNotifications.has(id)) {
+        return recentNotifications.get(id);
+    }
+    const sending = client.sendMessage(to || ADMIN_NUMBER, message);
+    if (id != null) {
+        recentNotifications.set(id, sending);
+        // A failed send may be retried
+        sending.catch(() => recentNotifications.delete(id));
+        if (recentNotifications.size > RECENT_NOTIFICATIONS_MAX) {
+            recentNotifications.delete(recentNotifications.keys().next().value);
+        }
+    }
+    return sending;
+}
+
+// Batched notifications from the Python outbox; reports success per message so
+// only the failed ones are retried
+app.post('/notify-batch', async (req, res) => {
+    const { messages = [] } = req.body;
+    const results = [];
+    for (const { id, to, message } of messages) {
+        try {
+            await sendNotificationOnce(id, to, message);
+            results.push({ ok: true });
+        } catch (err) {
+            console.error('❌ Failed to notify admin:', err.message);
+            results.push({ ok: false, error: err.message });
+        }
+    }
+    res.status(200).send({ results });
+});
+
 // Add endpoint to check if Python server is alive
 app.get('/ping', (req, res) => {
     res.status(200).send('pong');
@@ -437,11 +516,13 @@ app.get('/server-status', async (req, res) => {
 // Add endpoint to handle Supabase candidate storage
 app.post('/supabase-store', async (req, res) => {
   try {
-    console.log('Storing candidate in Supabase:', req.body);
+    // A single candidate or a batch of them (from the Python outbox)
+    const rows = Array.isArray(req.body) ? req.body : [req.body];
+    console.log(`Storing ${rows.length} candidate(s) in Supabase`);
     
     const { data, error } = await supabase
       .from('candidates')
-      .upsert(req.body, {
+      .upsert(rows, {
         onConflict: 'phone'
       });
       
@@ -6,11 +6,19 @@ import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from ".
 import { FileDown, FileUp, UserPlus } from "lucide-react";
 import { Badge } from "./ui/badge";
 import { useToast } from "./ui/use-toast";
-import { getQualifiedCandidates, getCandidateStats, Candidate } from "@/services/candidateService";
+import {
+  getQualifiedCandidates,
+  getCandidateStats,
+  getAllQualifiedCandidates,
+  Candidate,
+  CANDIDATES_PAGE_SIZE
+} from "@/services/candidateService";
 
 export function CandidatesList() {
   const [candidates, setCandidates] = useState<Candidate[]>([]);
   const [loading, setLoading] = useState(true);
+  const [page, setPage] = useState(0);
+  const [hasMore, setHasMore] = useState(false);
   const [stats, setStats] = useState({ qualified: 0, total: 0 });
   const { toast } = useToast();
 
@@ -24,6 +32,8 @@ export function CandidatesList() {
         ]);
         
         setCandidates(candidatesData || []);
+        setHasMore((candidatesData || []).length === CANDIDATES_PAGE_SIZE);
+        setPage(0);
         setStats(statsData);
       } catch (error) {
         console.error('Error fetching data:', error);
@@ -40,12 +50,42 @@ export function CandidatesList() {
     fetchData();
   }, [toast]);
 
-  const handleExport = () => {
-    if (candidates.length === 0) return;
+  const handleLoadMore = async () => {
+    try {
+      const nextPage = page + 1;
+      const more = await getQualifiedCandidates(nextPage);
+      setCandidates(prev => [...prev, ...more]);
+      setHasMore(more.length === CANDIDATES_PAGE_SIZE);
+      setPage(nextPage);
+    } catch (error) {
+      console.error('Error fetching more candidates:', error);
+      toast({
+        title: "Error",
+        description: "Failed to fetch more candidates",
+        variant: "destructive"
+      });
+    }
+  };
+
+  const handleExport = async () => {
+    // Fetch every page, not just the loaded ones, from the same source as the list
+    let allCandidates: Candidate[];
+    try {
+      allCandidates = await getAllQualifiedCandidates();
+    } catch (error) {
+      console.error('Error exporting candidates:', error);
+      toast({
+        title: "Error",
+        description: "Failed to export candidates",
+        variant: "destructive"
+      });
+      return;
+    }
+    if (allCandidates.length === 0) return;
     
     // Convert candidates to CSV
     const headers = "ID,Name,Phone,Company,Experience,CTC,Product,Notice Period,Qualified,Interview Scheduled,Date Added\n";
-    const rows = candidates.map(candidate => 
+    const rows = allCandidates.map(candidate => 
       `${candidate.id},"${candidate.name || candidate.company || ""}",${candidate.phone},"${candidate.company || ""}","${candidate.experience || ""}","${candidate.ctc || ""}","${candidate.product || ""}","${candidate.notice || ""}",${candidate.qualified},${candidate.interview_scheduled || false},"${candidate.date_added || ""}"`
     ).join('\n');
     
@@ -58,6 +98,7 @@ export function CandidatesList() {
     document.body.appendChild(a);
     a.click();
     document.body.removeChild(a);
+    URL.revokeObjectURL(url);
     
     toast({
       title: "Candidates Exported",
@@ -79,7 +120,7 @@ export function CandidatesList() {
             size="sm" 
             className="flex items-center space-x-2"
             onClick={handleExport}
-            disabled={candidates.length === 0}
+            disabled={stats.total === 0}
           >
             <FileDown className="w-4 h-4" />
             <span>Export</span>
@@ -172,6 +213,11 @@ export function CandidatesList() {
               </TableBody>
             </Table>
           )}
+          {!loading && hasMore && (
+            <div className="flex justify-center pt-4">
+              <Button variant="outline" size="sm" onClick={handleLoadMore}>Load more</Button>
+            </div>
+          )}
         </CardContent>
       </Card>
     </div>
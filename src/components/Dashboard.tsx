@@ -33,6 +33,7 @@ export function Dashboard() {
   const [connected, setConnected] = useState(false);
   const [candidates, setCandidates] = useState<Candidate[]>([]);
   const [qualifiedCandidates, setQualifiedCandidates] = useState<Candidate[]>([]);
+  const [candidateStats, setCandidateStats] = useState({ total: 0, qualified: 0 });
   const [conversations, setConversations] = useState<Conversation[]>([]);
   const [activeChatCount, setActiveChatCount] = useState(0);
   const [loading, setLoading] = useState(true);
@@ -49,13 +50,21 @@ export function Dashboard() {
           const pingResponse = await axios.get('http://localhost:5000/ping');
           
           if (pingResponse.status === 200) {
-            // Fetch candidates data
-            const candidatesResponse = await axios.get('http://localhost:5000/candidates');
-            setCandidates(candidatesResponse.data || []);
+            // Fetch candidate counts (the full list is never needed here)
+            const statsResponse = await axios.get('http://localhost:5000/candidates/stats');
+            setCandidateStats(statsResponse.data || { total: 0, qualified: 0 });
             
-            // Fetch qualified candidates
-            const qualifiedResponse = await axios.get('http://localhost:5000/qualified-candidates');
-            setQualifiedCandidates(qualifiedResponse.data || []);
+            // Fetch the most recent candidates
+            const candidatesResponse = await axios.get('http://localhost:5000/candidates', {
+              params: { limit: 5, order: 'desc' }
+            });
+            setCandidates(candidatesResponse.data?.candidates || []);
+            
+            // Fetch the most recent qualified candidates
+            const qualifiedResponse = await axios.get('http://localhost:5000/qualified-candidates', {
+              params: { limit: 20, order: 'desc' }
+            });
+            setQualifiedCandidates(qualifiedResponse.data?.candidates || []);
             
             // Fetch conversations
             const conversationsResponse = await axios.get('http://localhost:3000/conversations');
@@ -102,6 +111,7 @@ export function Dashboard() {
             
             setCandidates(mockCandidates);
             setQualifiedCandidates(mockCandidates.filter(c => c.qualified));
+            setCandidateStats({ total: mockCandidates.length, qualified: mockCandidates.filter(c => c.qualified).length });
             setConversations([
               { 
                 id: "916200083509@c.us",
@@ -156,7 +166,7 @@ export function Dashboard() {
           </CardHeader>
           <CardContent>
             <div className="flex items-center justify-between">
-              <div className="text-2xl font-bold">{candidates.length}</div>
+              <div className="text-2xl font-bold">{candidateStats.total}</div>
               <Users className="h-4 w-4 text-muted-foreground" />
             </div>
           </CardContent>
@@ -342,13 +352,13 @@ export function Dashboard() {
                     <div className="grid grid-cols-2 gap-4">
                       <div className="border rounded-lg p-4">
                         <p className="text-sm text-muted-foreground">Total Candidates</p>
-                        <p className="text-2xl font-bold">{candidates.length}</p>
+                        <p className="text-2xl font-bold">{candidateStats.total}</p>
                       </div>
                       <div className="border rounded-lg p-4">
                         <p className="text-sm text-muted-foreground">Qualification Rate</p>
                         <p className="text-2xl font-bold">
-                          {candidates.length > 0 
-                            ? `${Math.round((qualifiedCandidates.length / candidates.length) * 100)}%` 
+                          {candidateStats.total > 0 
+                            ? `${Math.round((candidateStats.qualified / candidateStats.total) * 100)}%` 
                             : '0%'}
                         </p>
                       </div>
@@ -60,13 +60,19 @@ export const storeCandidate = async (phone: string, answers: Record<string, any>
   }
 };
 
-export const getQualifiedCandidates = async (): Promise<Candidate[]> => {
+export const CANDIDATES_PAGE_SIZE = 50;
+
+// Rows per Supabase request when fetching every candidate for an export
+export const CANDIDATES_EXPORT_PAGE_SIZE = 1000;
+
+export const getQualifiedCandidates = async (page = 0, pageSize = CANDIDATES_PAGE_SIZE): Promise<Candidate[]> => {
   try {
     const { data, error } = await supabase
       .from('candidates')
       .select('*')
       .eq('qualification', 'qualified')
-      .order('created_at', { ascending: false });
+      .order('created_at', { ascending: false })
+      .range(page * pageSize, (page + 1) * pageSize - 1);
 
     if (error) {
       console.error('Error fetching qualified candidates:', error);
@@ -92,6 +98,16 @@ export const getQualifiedCandidates = async (): Promise<Candidate[]> => {
   }
 };
 
+// Every qualified candidate, fetched page by page from the same table the list shows
+export const getAllQualifiedCandidates = async (): Promise<Candidate[]> => {
+  const all: Candidate[] = [];
+  for (let page = 0; ; page++) {
+    const rows = await getQualifiedCandidates(page, CANDIDATES_EXPORT_PAGE_SIZE);
+    all.push(...rows);
+    if (rows.length < CANDIDATES_EXPORT_PAGE_SIZE) return all;
+  }
+};
+
 export const getCandidateStats = async () => {
   try {
     const { count: qualifiedCount } = await supabase
@@ -0,0 +1,476 @@
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager, ExitStack
+
+from db import get_connection, transaction
+
+LEGACY_STATE_FILE = 'state.json'
+
+# How long a worker may hold a sender's lock before others may take it over
+LOCK_LEASE_SECONDS = 60
+# How often a batch holding sender locks extends its leases
+LOCK_RENEW_SECONDS = LOCK_LEASE_SECONDS / 3
+
+# Conversations idle for this long are dropped (seconds; 0 keeps them forever)
+CONVERSATION_TTL = float(os.environ.get('CONVERSATION_TTL', 14 * 24 * 3600))
+
+# Blocked senders are remembered this long (seconds; 0 = forever)
+BLOCKED_TTL = float(os.environ.get('BLOCKED_TTL', 0))
+
+# How often the background reaper runs, and how many rows it deletes per transaction
+REAP_INTERVAL = 60
+REAP_BATCH = 1000
+
+
+def is_blocked(user):
+    return bool(user.get('flags', {}).get('blocked'))
+
+
+def tombstone_user(step, acknowledged):
+    """What is left of a blocked conversation: enough for ask() to stay silent or say thanks once"""
+    return {"step": step, "answers": {}, "flags": {"blocked": True, "acknowledged": bool(acknowledged)}}
+
+
+class SenderLocks:
+    """One lock per sender inside this process, created on demand.
+
+    Messages from the same sender queue up behind each other while different
+    senders proceed in parallel. Locks are dropped once nobody holds or waits on them.
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}
+
+    @contextmanager
+    def hold(self, sender):
+        with self._guard:
+            entry = self._locks.get(sender)
+            if entry is None:
+                entry = self._locks[sender] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[sender]
+
+
+class SqliteStateStore:
+    """Conversation state stored as one row per sender in SQLite (WAL mode).
+
+    Reading or updating a conversation touches only that sender's row, so the
+    cost of a message no longer grows with the number of active chats.
+
+    Blocked senders are kept as tombstones in blocked_senders (step and whether
+    they acknowledged) instead of full conversations, and a background reaper
+    drops conversations idle for longer than the TTL, so the table only holds
+    conversations that are still going.
+    """
+
+    def __init__(self, path=None, legacy_file=LEGACY_STATE_FILE, ttl=CONVERSATION_TTL, blocked_ttl=BLOCKED_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.blocked_ttl = blocked_ttl
+        self._reaper_started = False
+        self._reaper_lock = threading.Lock()
+        conn = self._conn()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS conversations (
+                   sender TEXT PRIMARY KEY,
+                   data TEXT NOT NULL,
+                   updated_at REAL NOT NULL
+               )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations (updated_at)")
+        had_tombstones = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'blocked_senders'"
+        ).fetchone()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS blocked_senders (
+                   sender TEXT PRIMARY KEY,
+                   step TEXT,
+                   acknowledged INTEGER NOT NULL DEFAULT 0,
+                   blocked_at REAL NOT NULL
+               )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_blocked_senders_at ON blocked_senders (blocked_at)")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS sender_locks (
+                   sender TEXT PRIMARY KEY,
+                   owner TEXT NOT NULL,
+                   expires_at REAL NOT NULL
+               )"""
+        )
+        self._local_locks = SenderLocks()
+        if legacy_file:
+            self._migrate(legacy_file)
+        if not had_tombstones:
+            with transaction(conn):
+                moved = self._tombstone_blocked(conn)
+            if moved:
+                print(f"Moved {moved} blocked conversations to blocked_senders")
+
+    def _conn(self):
+        return get_connection(self.path)
+
+    @staticmethod
+    def _tombstone_blocked(conn):
+        """Replace stored blocked conversations with tombstones; returns how many"""
+        blocked = []
+        for row in conn.execute("SELECT sender, data, updated_at FROM conversations WHERE data LIKE '%\"blocked\"%'"):
+            user = json.loads(row['data'])
+            if is_blocked(user):
+                blocked.append((row['sender'], user.get('step'), int(bool(user['flags'].get('acknowledged'))),
+                                row['updated_at']))
+        conn.executemany(
+            "INSERT OR REPLACE INTO blocked_senders (sender, step, acknowledged, blocked_at) VALUES (?, ?, ?, ?)",
+            blocked
+        )
+        conn.executemany("DELETE FROM conversations WHERE sender = ?", [(b[0],) for b in blocked])
+        return len(blocked)
+
+    def _migrate(self, legacy_file):
+        """Import an old whole-file state.json once, then move it aside"""
+        if not os.path.exists(legacy_file):
+            return
+        conn = self._conn()
+        with transaction(conn):
+            # Another worker may have migrated while we waited for the lock
+            if not os.path.exists(legacy_file):
+                return
+            try:
+                with open(legacy_file) as f:
+                    state = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading legacy state file: {e}")
+                return
+            now = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO conversations (sender, data, updated_at) VALUES (?, ?, ?)",
+                [(sender, json.dumps(user), now) for sender, user in state.items()]
+            )
+            self._tombstone_blocked(conn)
+            os.replace(legacy_file, legacy_file + '.migrated')
+        print(f"Migrated {len(state)} conversations from {legacy_file}")
+
+    @contextmanager
+    def lock(self, sender):
+        """Serialize work on one sender across threads and worker processes.
+
+        Threads in this process wait on an in-memory lock; across processes the
+        holder owns a lease row in sender_locks, which expires if a worker dies.
+        """
+        with self._local_locks.hold(sender):
+            owner = uuid.uuid4().hex
+            self._acquire(sender, owner)
+            try:
+                yield
+            finally:
+                self._conn().execute("DELETE FROM sender_locks WHERE sender = ? AND owner = ?", (sender, owner))
+
+    @contextmanager
+    def lock_many(self, senders):
+        """Hold the locks of several senders, taken in sorted order so batches cannot deadlock.
+
+        A batch can outlast LOCK_LEASE_SECONDS (several Mistral calls in a row
+        for one sender), so its leases are renewed in the background until it ends.
+        """
+        senders = sorted(set(senders))
+        owner = uuid.uuid4().hex
+        with ExitStack() as stack:
+            for sender in senders:
+                stack.enter_context(self._local_locks.hold(sender))
+            stop = threading.Event()
+            renewer = threading.Thread(target=self._renew, args=(owner, stop), name='lock-renew', daemon=True)
+            renewer.start()
+            try:
+                for sender in senders:
+                    self._acquire(sender, owner)
+                yield
+            finally:
+                stop.set()
+                renewer.join()
+                self._conn().execute("DELETE FROM sender_locks WHERE owner = ?", (owner,))
+
+    def _acquire(self, sender, owner):
+        """Wait for the sender's lease (free or expired) and take it"""
+        conn = self._conn()
+        delay = 0.002
+        while True:
+            now = time.time()
+            acquired = conn.execute(
+                """INSERT INTO sender_locks (sender, owner, expires_at) VALUES (?, ?, ?)
+                   ON CONFLICT(sender) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                   WHERE sender_locks.expires_at < ?""",
+                (sender, owner, now + LOCK_LEASE_SECONDS, now)
+            ).rowcount
+            if acquired:
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def _renew(self, owner, stop):
+        """Extend the owner's leases every LOCK_RENEW_SECONDS until `stop` is set"""
+        conn = self._conn()
+        while not stop.wait(LOCK_RENEW_SECONDS):
+            try:
+                conn.execute(
+                    "UPDATE sender_locks SET expires_at = ? WHERE owner = ?",
+                    (time.time() + LOCK_LEASE_SECONDS, owner)
+                )
+            except Exception as e:
+                print(f"Error renewing sender locks: {e}")
+
+    def get(self, sender):
+        """The sender's conversation, a tombstone user if they are blocked, or None"""
+        rows = self._conn().execute(
+            """SELECT data, NULL AS step, NULL AS acknowledged FROM conversations WHERE sender = ?
+               UNION ALL
+               SELECT NULL, step, acknowledged FROM blocked_senders WHERE sender = ?""",
+            (sender, sender)
+        ).fetchall()
+        for row in rows:
+            if row['data'] is not None:
+                return json.loads(row['data'])
+        return tombstone_user(rows[0]['step'], rows[0]['acknowledged']) if rows else None
+
+    def get_many(self, senders):
+        """Return {sender: user} for the senders that have stored state (or are blocked)"""
+        senders = list(set(senders))
+        found = {}
+        conn = self._conn()
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(senders), 500):
+            chunk = senders[i:i + 500]
+            marks = ','.join('?' * len(chunk))
+            for row in conn.execute(f"SELECT sender, step, acknowledged FROM blocked_senders WHERE sender IN ({marks})", chunk):
+                found[row['sender']] = tombstone_user(row['step'], row['acknowledged'])
+            for row in conn.execute(f"SELECT sender, data FROM conversations WHERE sender IN ({marks})", chunk):
+                found[row['sender']] = json.loads(row['data'])
+        return found
+
+    def save_many(self, updates):
+        """Apply {sender: user} in one transaction; a user of None deletes that conversation.
+        Blocked users are stored as tombstones."""
+        now = time.time()
+        conn = self._conn()
+        with transaction(conn):
+            conn.executemany(
+                """INSERT INTO conversations (sender, data, updated_at) VALUES (?, ?, ?)
+                   ON CONFLICT(sender) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at""",
+                [(sender, json.dumps(user, separators=(',', ':')), now)
+                 for sender, user in updates.items() if user is not None and not is_blocked(user)]
+            )
+            blocked = [(sender, user) for sender, user in updates.items() if user is not None and is_blocked(user)]
+            self._block(conn, blocked, now)
+            gone = [(sender,) for sender, user in updates.items() if user is None]
+            conn.executemany("DELETE FROM conversations WHERE sender = ?", gone)
+            conn.executemany("DELETE FROM blocked_senders WHERE sender = ?", gone)
+
+    @staticmethod
+    def _block(conn, blocked, now):
+        conn.executemany(
+            """INSERT INTO blocked_senders (sender, step, acknowledged, blocked_at) VALUES (?, ?, ?, ?)
+               ON CONFLICT(sender) DO UPDATE SET acknowledged = excluded.acknowledged""",
+            [(sender, user.get('step'), int(bool(user['flags'].get('acknowledged'))), now) for sender, user in blocked]
+        )
+        conn.executemany("DELETE FROM conversations WHERE sender = ?", [(sender,) for sender, _ in blocked])
+
+    def put(self, sender, user):
+        if is_blocked(user):
+            conn = self._conn()
+            with transaction(conn):
+                self._block(conn, [(sender, user)], time.time())
+            return
+        self._conn().execute(
+            """INSERT INTO conversations (sender, data, updated_at) VALUES (?, ?, ?)
+               ON CONFLICT(sender) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at""",
+            (sender, json.dumps(user, separators=(',', ':')), time.time())
+        )
+
+    def delete(self, sender):
+        """Forget a conversation, and unblock the sender"""
+        conn = self._conn()
+        with transaction(conn):
+            conn.execute("DELETE FROM conversations WHERE sender = ?", (sender,))
+            conn.execute("DELETE FROM blocked_senders WHERE sender = ?", (sender,))
+
+    def items(self):
+        """Yield (sender, user, updated_at) for every stored conversation"""
+        cursor = self._conn().execute("SELECT sender, data, updated_at FROM conversations ORDER BY updated_at DESC")
+        for row in cursor:
+            yield row['sender'], json.loads(row['data']), row['updated_at']
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def blocked_count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM blocked_senders").fetchone()[0]
+
+    def _delete_older(self, conn, table, column, cutoff):
+        """Delete rows older than `cutoff` a batch per transaction, so writers are never held up for long"""
+        deleted = 0
+        while True:
+            with transaction(conn):
+                n = conn.execute(
+                    f"""DELETE FROM {table} WHERE rowid IN (
+                            SELECT rowid FROM {table} WHERE {column} < ? LIMIT ?)""",
+                    (cutoff, REAP_BATCH)
+                ).rowcount
+            deleted += n
+            if n < REAP_BATCH:
+                return deleted
+
+    def expire(self, now=None):
+        """Drop idle conversations, expired tombstones and abandoned lock leases.
+
+        Returns {"conversations": n, "blocked": n}.
+        """
+        now = now or time.time()
+        conn = self._conn()
+        expired = {"conversations": 0, "blocked": 0}
+        if self.ttl:
+            expired["conversations"] = self._delete_older(conn, 'conversations', 'updated_at', now - self.ttl)
+        if self.blocked_ttl:
+            expired["blocked"] = self._delete_older(conn, 'blocked_senders', 'blocked_at', now - self.blocked_ttl)
+        conn.execute("DELETE FROM sender_locks WHERE expires_at < ?", (now - LOCK_LEASE_SECONDS,))
+        return expired
+
+    def start_reaper(self, interval=REAP_INTERVAL):
+        """Run expire() in the background every `interval` seconds"""
+        with self._reaper_lock:
+            if self._reaper_started:
+                return
+            threading.Thread(target=_reap, args=(self, interval), name='state-reaper', daemon=True).start()
+            self._reaper_started = True
+
+
+class MemoryStateStore:
+    """In-process conversation state, for single-worker development and benchmarks"""
+
+    def __init__(self, ttl=CONVERSATION_TTL, blocked_ttl=BLOCKED_TTL):
+        self.ttl = ttl
+        self.blocked_ttl = blocked_ttl
+        self._data = {}
+        # sender -> (step, acknowledged, blocked_at)
+        self._blocked = {}
+        self._lock = threading.Lock()
+        self._sender_locks = SenderLocks()
+        self._reaper_started = False
+        self._reaper_lock = threading.Lock()
+
+    def lock(self, sender):
+        """Serialize work on one sender; only meaningful within a single process"""
+        return self._sender_locks.hold(sender)
+
+    @contextmanager
+    def lock_many(self, senders):
+        with ExitStack() as stack:
+            for sender in sorted(set(senders)):
+                stack.enter_context(self.lock(sender))
+            yield
+
+    def get(self, sender):
+        with self._lock:
+            entry = self._data.get(sender)
+            tombstone = self._blocked.get(sender)
+        if entry:
+            return json.loads(entry[0])
+        return tombstone_user(*tombstone[:2]) if tombstone else None
+
+    def get_many(self, senders):
+        found = {}
+        for sender in set(senders):
+            user = self.get(sender)
+            if user is not None:
+                found[sender] = user
+        return found
+
+    def _store(self, sender, user, now):
+        if user is None:
+            self._data.pop(sender, None)
+            self._blocked.pop(sender, None)
+        elif is_blocked(user):
+            self._data.pop(sender, None)
+            blocked_at = self._blocked[sender][2] if sender in self._blocked else now
+            self._blocked[sender] = (user.get('step'), bool(user['flags'].get('acknowledged')), blocked_at)
+        else:
+            self._data[sender] = (json.dumps(user), now)
+
+    def save_many(self, updates):
+        now = time.time()
+        with self._lock:
+            for sender, user in updates.items():
+                self._store(sender, user, now)
+
+    def put(self, sender, user):
+        with self._lock:
+            self._store(sender, user, time.time())
+
+    def delete(self, sender):
+        with self._lock:
+            self._store(sender, None, time.time())
+
+    def items(self):
+        with self._lock:
+            entries = sorted(self._data.items(), key=lambda e: e[1][1], reverse=True)
+        for sender, (data, updated_at) in entries:
+            yield sender, json.loads(data), updated_at
+
+    def count(self):
+        with self._lock:
+            return len(self._data)
+
+    def blocked_count(self):
+        with self._lock:
+            return len(self._blocked)
+
+    def expire(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            idle = [s for s, (_, at) in self._data.items() if self.ttl and at < now - self.ttl]
+            for sender in idle:
+                del self._data[sender]
+            old = [s for s, (_, _, at) in self._blocked.items() if self.blocked_ttl and at < now - self.blocked_ttl]
+            for sender in old:
+                del self._blocked[sender]
+        return {"conversations": len(idle), "blocked": len(old)}
+
+    def start_reaper(self, interval=REAP_INTERVAL):
+        with self._reaper_lock:
+            if self._reaper_started:
+                return
+            threading.Thread(target=_reap, args=(self, interval), name='state-reaper', daemon=True).start()
+            self._reaper_started = True
+
+
+def _reap(store, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            expired = store.expire()
+            if expired["conversations"] or expired["blocked"]:
+                print(f"Expired {expired['conversations']} idle conversations and {expired['blocked']} blocked senders")
+        except Exception as e:
+            print(f"Error expiring conversations: {e}")
+
+
+STATE_BACKENDS = {
+    'sqlite': SqliteStateStore,
+    'memory': MemoryStateStore,
+}
+
+
+def open_state_store(backend=None):
+    """Create the conversation state backend selected by STATE_BACKEND (default: sqlite)"""
+    backend = (backend or os.environ.get('STATE_BACKEND', 'sqlite')).lower()
+    if backend not in STATE_BACKENDS:
+        raise ValueError(f"Unknown state backend: {backend}")
+    return STATE_BACKENDS[backend]()
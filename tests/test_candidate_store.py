@@ -0,0 +1,17 @@
+from candidate_store import CandidateStore
+
+FIELDS = {'company': 'HDFC Bank', 'experience': '3 years', 'ctc': '4 lpa', 'product': 'home loan',
+          'notice': '30 days', 'qualified': True}
+
+
+def test_candidate_records_are_kept_per_profile(tmp_path):
+    store = CandidateStore(str(tmp_path / 'bot.db'), legacy_file=None)
+    first = store.upsert('919000000003', FIELDS)
+    other = store.upsert('919000000003', dict(FIELDS, product='car loan', qualified=False), profile='sales')
+    again = store.upsert('919000000003', dict(FIELDS, notice='15 days'))
+    assert other['id'] != first['id']
+    assert again['id'] == first['id'] and again['notice'] == '15 days'
+    assert again['product'] == 'home loan' and again['profile'] == 'default'
+    assert store.existing_phones(['919000000003'], 'sales') == {'919000000003'}
+    assert store.existing_phones(['919000000003'], 'other') == set()
+    assert store.page(profile='default')[0] == [again]
@@ -0,0 +1,37 @@
+import gzip
+import os
+import time
+
+from chatlog import ChatLog, STALE_SEGMENT_SECONDS
+
+
+def _segment(directory, name, line, age):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(line)
+    modified = time.time() - age
+    os.utime(path, (modified, modified))
+    return path
+
+
+def test_maintenance_compresses_leftovers_and_expires_old_segments(tmp_path):
+    directory = str(tmp_path / 'chatlogs')
+    line = '{"s": "a@c.us", "t": "2026-01-01T00:00:00", "r": "user", "m": "hi"}\n'
+
+    log = ChatLog(directory, path=str(tmp_path / 'bot.db'), ttl=30 * 24 * 3600)
+    left = _segment(directory, '20260101-000000-111-0001.jsonl', line, STALE_SEGMENT_SECONDS + 60)
+    busy = _segment(directory, '20260101-000000-222-0001.jsonl', line, 5)
+    old = _segment(directory, '20250101-000000-333-0001.jsonl', line, 40 * 24 * 3600)
+    log._conn().executemany(
+        "INSERT INTO chatlog_index (sender, segment, first_at) VALUES (?, ?, ?)",
+        [('a@c.us', os.path.basename(p)[:-len('.jsonl')], '2026-01-01') for p in (left, busy, old)]
+    )
+    done = log.maintain()
+    assert done == {"compressed": 1, "deleted": 1}
+    assert not os.path.exists(left) and os.path.exists(left + '.gz')
+    with gzip.open(left + '.gz', 'rt', encoding='utf-8') as f:
+        assert f.read() == line
+    assert os.stat(left + '.gz').st_mtime < time.time() - STALE_SEGMENT_SECONDS
+    assert os.path.exists(busy)
+    assert not os.path.exists(old)
+    assert len(log.read('a@c.us')) == 2
@@ -0,0 +1,66 @@
+import pytest
+
+from extractors import extract, parse_ctc_lpa, parse_experience_years, parse_notice_days
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('4 lpa', 4.0),
+    ('4.5 LPA', 4.5),
+    ('2.5 lakh', 2.5),
+    ('3 lakh 50 thousand', 3.5),
+    ('3,50,000', 3.5),
+    ('450000', 4.5),
+    ('350k', 3.5),
+    ('25k', 3.0),
+    ('25k per month', 3.0),
+    ('30000 monthly', 3.6),
+    ('1 cr', 100.0),
+    ('my ctc is 8 lpa', 8.0),
+    ('5', 5.0),
+    ('500', None),
+    ('not disclosed', None),
+    (None, None),
+])
+def test_parse_ctc_lpa(text, expected):
+    assert parse_ctc_lpa(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('30 days', 30.0),
+    ('2 months', 60.0),
+    ('two months', 60.0),
+    ('a month', 30.0),
+    ('3 months 15 days', 105.0),
+    ('2 weeks', 14.0),
+    ('immediate', 0.0),
+    ('already resigned', 0.0),
+    # A bare number is days, whatever its size
+    ('2', 2.0),
+    ('3', 3.0),
+    ('7', 7.0),
+    ('45', 45.0),
+    ('90', 90.0),
+    ('not sure', None),
+])
+def test_parse_notice_days(text, expected):
+    assert parse_notice_days(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('3 years', 3.0),
+    ('2.5', 2.5),
+    ('2 years 6 months', 2.5),
+    ('18 months', 1.5),
+    ('5+ yrs', 5.0),
+    ('fresher', 0.0),
+    ('no experience', 0.0),
+    ('a lot', None),
+])
+def test_parse_experience_years(text, expected):
+    assert parse_experience_years(text) == expected
+
+
+def test_extract_by_step():
+    assert extract('notice', '45') == {'notice_days': 45.0}
+    assert extract('ctc', '4 lpa') == {'ctc_lpa': 4.0}
+    assert extract('company', 'HDFC Bank') == {}
@@ -0,0 +1,73 @@
+import os
+import random
+
+import pytest
+from fuzzywuzzy import fuzz
+
+from config import load_config, DATA_FILE, FAQ_FILE, FAQ_SYNONYMS_FILE
+from faq_index import FaqIndex
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_faqs():
+    """The default profile's FAQ keys (in file order) and synonyms"""
+    config = load_config(*(os.path.join(ROOT, name) for name in (DATA_FILE, FAQ_FILE, FAQ_SYNONYMS_FILE)))
+    assert config.faq_responses and config.faq_synonyms
+    return list(config.faq_responses), config.faq_synonyms
+
+
+def _partial_ratio_loop(message, faqs, synonyms, threshold):
+    """detect_faq() before the index: score every variant of every FAQ in order"""
+    message = message.lower()
+    for key in faqs:
+        variants = [key.lower()] + [v.lower() for v in synonyms.get(key.lower(), [])]
+        if any(fuzz.partial_ratio(message, v) > threshold for v in variants):
+            return key
+    return None
+
+
+def _typo(text, rng):
+    """text with one character dropped, swapped in or added"""
+    i = rng.randrange(len(text) + 1)
+    letter = rng.choice('abcdefghijklmnopqrstuvwxyz ')
+    edit = rng.choice(['drop', 'replace', 'insert'])
+    if edit == 'drop' and i < len(text):
+        return text[:i] + text[i + 1:]
+    if edit == 'replace' and i < len(text):
+        return text[:i] + letter + text[i + 1:]
+    return text[:i] + letter + text[i:]
+
+
+FIXED_MESSAGES = [
+    "", "a", "ok", "ha", "yes", "no", "kahan", "salary kitni hai", "what is the ctc?", "job location?",
+    "Which branch is this for", "profile kya hai", "HDFC Bank", "30 days", "4 lpa", "home loan",
+    "I am interested", "paise kitne milenge", "compensation details please", "place", "pay",
+    "kota", "3 years experience in LAP", "Currently not working",
+]
+
+
+def _typod_messages(faqs, synonyms, count=2000, seed=7):
+    rng = random.Random(seed)
+    variants = [k for k in faqs] + [v for vs in synonyms.values() for v in vs]
+    fillers = ["", "sir ", "please tell ", "what is the ", "kya hai ", " batao", "?", " for this job"]
+    messages = []
+    for _ in range(count):
+        text = rng.choice(variants)
+        for _ in range(rng.randint(0, 3)):
+            text = _typo(text, rng)
+        messages.append(rng.choice(fillers) + text + rng.choice(fillers))
+    return messages
+
+
+@pytest.mark.parametrize('threshold', [90, 95])
+def test_match_agrees_with_partial_ratio_loop(threshold):
+    faqs, synonyms = _load_faqs()
+    index = FaqIndex(faqs, synonyms, threshold=threshold)
+    for message in FIXED_MESSAGES + _typod_messages(faqs, synonyms):
+        assert index.match(message) == _partial_ratio_loop(message, faqs, synonyms, threshold), message
+
+
+def test_thresholds_below_90_are_refused():
+    with pytest.raises(ValueError):
+        FaqIndex(['ctc'], threshold=80)
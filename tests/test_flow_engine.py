@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from config import load_config, DATA_FILE, FAQ_FILE, FAQ_SYNONYMS_FILE
+from flow_engine import FlowMachine, parse_condition
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _default_machine():
+    return load_config(*(os.path.join(ROOT, name) for name in (DATA_FILE, FAQ_FILE, FAQ_SYNONYMS_FILE))).machine
+
+
+def _walk(machine, flags):
+    steps = [machine.first_step(flags)]
+    while steps[-1] is not None:
+        steps.append(machine.next_step(steps[-1], flags))
+    return steps[:-1]
+
+
+def test_parse_condition():
+    assert parse_condition('') == ()
+    assert parse_condition(None) == ()
+    assert parse_condition('unemployed') == (('unemployed', True),)
+    assert parse_condition(' !unemployed | fresher |') == (('unemployed', False), ('fresher', True))
+
+
+def test_default_flow_for_employed_candidate():
+    machine = _default_machine()
+    assert _walk(machine, {}) == ['interest', 'company', 'notice', 'ctc', 'product', 'experience', 'cv']
+    assert machine.ask('product', {}, {}) == "Ok, Which product are you currently handling?"
+
+
+def test_default_flow_for_unemployed_candidate():
+    machine = _default_machine()
+    flags = {'unemployed': True}
+    # company -> prev_company -> ctc: notice is skipped, the previous company is asked
+    assert _walk(machine, flags) == ['interest', 'company', 'prev_company', 'ctc', 'product', 'experience', 'cv']
+    assert machine.next_step('company', flags) == 'prev_company'
+    assert machine.next_step('prev_company', flags) == 'ctc'
+    assert machine.ask('product', flags, {}) == "Ok, Which product were you handling previously?"
+
+
+def test_transition_table_covers_every_flag_combination():
+    machine = FlowMachine([
+        {'step': 'a', 'ask': 'A?'},
+        {'step': 'b', 'ask': 'B?', 'skip_if': 'x|!y'},
+        {'step': 'c', 'ask': 'C {a}?', 'alt_if': 'x', 'alt_ask': 'Other C {a}?'},
+        {'step': 'd', 'ask': 'D?', 'skip_if': 'y'},
+    ])
+    assert machine.flags == ['x', 'y']
+    assert len(machine.transitions) == 4 * (len(machine.steps) + 1)
+    assert _walk(machine, {}) == ['a', 'c', 'd']
+    assert _walk(machine, {'y': True}) == ['a', 'b', 'c']
+    assert _walk(machine, {'x': True, 'y': True}) == ['a', 'c']
+    # Flags no rule mentions don't change anything
+    assert _walk(machine, {'y': True, 'unrelated': True}) == ['a', 'b', 'c']
+    assert machine.ask('c', {}, {'a': 'yes'}) == 'C yes?'
+    assert machine.ask('c', {'x': True}, {'a': 'yes'}) == 'Other C yes?'
+
+
+def test_first_step_can_be_skipped():
+    machine = FlowMachine([{'step': 'a', 'ask': 'A?', 'skip_if': 'x'}, {'step': 'b', 'ask': 'B?'}])
+    assert machine.first_step({'x': True}) == 'b'
+    assert machine.first_step() == 'a'
+
+
+def test_invalid_flows_are_rejected():
+    with pytest.raises(ValueError):
+        FlowMachine([{'step': 'a', 'ask': 'A?'}, {'step': 'a', 'ask': 'Again?'}])
+    with pytest.raises(ValueError):
+        FlowMachine([{'step': 'a', 'ask': 'A?', 'alt_if': 'x'}])
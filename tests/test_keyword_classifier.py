@@ -0,0 +1,31 @@
+import pytest
+
+from keyword_classifier import KeywordClassifier
+
+SIGNALS = KeywordClassifier({
+    'acknowledgement': ["ok", "no problem"],
+    'not_interested': ["no", "na", "not interested"],
+    'interest': ["interested"],
+    'fresher': ["0 years", "no experience"],
+    'ctc': ["rs", "lpa"],
+})
+
+
+@pytest.mark.parametrize('message, expected', [
+    # Keywords must stand alone, not inside longer words or numbers
+    ("I work in Kota", set()),
+    ("na", {'not_interested'}),
+    ("10 years", set()),
+    ("0 years", {'fresher'}),
+    ("worked 5 years", set()),
+    ("rs 30000", {'ctc'}),
+    ("my notice is 30 days", set()),
+    # Units glued to a number still count
+    ("5lpa", {'ctc'}),
+    # The longest phrase at a position wins
+    ("no problem", {'acknowledgement'}),
+    ("not interested", {'not_interested'}),
+    ("no experience", {'fresher'}),
+])
+def test_classify_boundaries(message, expected):
+    assert SIGNALS.classify(message) == expected
@@ -0,0 +1,39 @@
+import os
+
+from db import get_connection
+from metrics import Metrics
+
+
+def _worker(path, pid, monkeypatch, messages):
+    """A Metrics instance standing in for worker process `pid` that counted `messages`"""
+    monkeypatch.setattr(os, 'getpid', lambda: pid)
+    metrics = Metrics(path)
+    counter = metrics.counter('bot_messages_total', 'Messages', ['outcome'])
+    histogram = metrics.histogram('bot_request_seconds', 'Latency')
+    for _ in range(messages):
+        counter.inc('answered')
+        histogram.observe(0.01)
+    metrics.publish()
+    return metrics
+
+
+def _totals(metrics, pid, monkeypatch):
+    monkeypatch.setattr(os, 'getpid', lambda: pid)
+    merged = metrics._merged()
+    return merged['bot_messages_total'][('answered',)], sum(merged['bot_request_seconds'][()][0])
+
+
+def test_stopped_workers_keep_their_totals(tmp_path, monkeypatch):
+    path = str(tmp_path / 'bot.db')
+    _worker(path, 111, monkeypatch, 3)
+    live = _worker(path, 222, monkeypatch, 2)
+    assert _totals(live, 222, monkeypatch) == (5, 5)
+
+    # Worker 111 stops publishing and is eventually treated as stopped
+    get_connection(path).execute("UPDATE metrics_snapshots SET updated_at = 0 WHERE pid = 111")
+    assert _totals(live, 222, monkeypatch) == (5, 5)
+    assert _totals(live, 222, monkeypatch) == (5, 5)
+
+    # A restarted worker that gets pid 222 again doesn't overwrite the old totals
+    restarted = _worker(path, 222, monkeypatch, 1)
+    assert _totals(restarted, 222, monkeypatch) == (6, 6)
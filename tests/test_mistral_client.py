@@ -0,0 +1,31 @@
+from mistral_client import trim_history, SUMMARY_PREFIX
+
+
+def _conversation(turns):
+    history = []
+    for n in range(turns):
+        history.append({"role": "assistant", "content": f"Question {n}? " + "x" * 80})
+        history.append({"role": "user", "content": f"answer {n}"})
+    return history
+
+
+def test_summary_is_a_system_message_sent_but_not_stored():
+    history = _conversation(20)
+
+    sent = trim_history(history, budget=200)
+    assert sent[0]['role'] == 'system'
+    assert sent[0]['content'].startswith(SUMMARY_PREFIX)
+    assert 'answer 0' in sent[0]['content']
+    assert all(m['role'] != 'system' for m in sent[1:])
+
+    stored = trim_history(history, budget=200, summarize=False)
+    # What is sent after the summary is the newest part of what is stored
+    assert stored[len(stored) - len(sent) + 1:] == sent[1:]
+    assert all(m['role'] != 'system' for m in stored)
+
+
+def test_summaries_stored_by_older_versions_are_dropped():
+    legacy = {"role": "assistant", "content": SUMMARY_PREFIX + "answer 0"}
+    history = [legacy] + _conversation(2)
+
+    assert trim_history(history, budget=10_000) == _conversation(2)
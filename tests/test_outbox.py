@@ -0,0 +1,41 @@
+from outbox import Outbox
+
+
+def test_notify_batches_are_small_and_carry_stable_ids(tmp_path):
+    outbox = Outbox(str(tmp_path / 'bot.db'), base_delay=0)
+    calls = []
+
+    def deliver(payloads, ids):
+        calls.append((payloads, ids))
+        # The first attempt fails, as when the request to Node times out
+        return [len(calls) > 1] * len(payloads)
+
+    outbox._started = True  # deliver from the test, not the worker thread
+    outbox.register('notify', deliver, batch_size=2, ids=True)
+    outbox.enqueue_many('notify', [{"message": str(n)} for n in range(3)])
+
+    outbox.process_due()
+    assert [len(payloads) for payloads, _ in calls] == [2]
+    outbox.process_due()
+    assert len(calls) == 3
+
+    # Each message is retried under the id it had the first time
+    ids_by_message = {}
+    for payloads, ids in calls:
+        assert len(payloads) <= 2
+        for payload, item_id in zip(payloads, ids):
+            ids_by_message.setdefault(payload['message'], set()).add(item_id)
+    assert sorted(ids_by_message) == ['0', '1', '2']
+    assert all(len(ids) == 1 for ids in ids_by_message.values())
+    assert outbox.stats()['pending'] == 0
+
+
+def test_handlers_without_ids_get_payloads_only(tmp_path):
+    outbox = Outbox(str(tmp_path / 'bot.db'), batch_size=50)
+    outbox._started = True
+    batches = []
+    outbox.register('supabase_sync', lambda payloads: batches.append(payloads) or [True] * len(payloads))
+    outbox.enqueue_many('supabase_sync', [{"phone": str(n)} for n in range(60)])
+
+    outbox.process_due()
+    assert [len(batch) for batch in batches] == [50, 10]
@@ -0,0 +1,46 @@
+import os
+import shutil
+
+import pytest
+
+from profiles import DEFAULT_PROFILE, ProfileRegistry
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _registry(tmp_path):
+    return ProfileRegistry({'max_ctc': 6}, None, directory=str(tmp_path / 'profiles'), path=str(tmp_path / 'bot.db'))
+
+
+def test_profile_added_after_start_is_seen_by_other_workers(tmp_path):
+    # Both "workers" started before the profile directory existed
+    worker_a, worker_b = _registry(tmp_path), _registry(tmp_path)
+    os.makedirs(tmp_path / 'profiles' / 'sales')
+    shutil.copy(os.path.join(REPO_DIR, 'data.csv'), tmp_path / 'profiles' / 'sales' / 'data.csv')
+
+    worker_a.scan()
+    worker_a.assign(['9@c.us'], 'sales')
+
+    assert worker_b.profile_for('9@c.us') == 'sales'
+    assert worker_b.get('sales').id == 'sales'
+
+
+def test_unknown_profiles(tmp_path):
+    registry = _registry(tmp_path)
+    for profile_id in ('nope', '../profiles', '.hidden'):
+        with pytest.raises(KeyError):
+            registry.get(profile_id)
+    assert registry.profile_for('1@c.us') == DEFAULT_PROFILE
+
+
+def test_criteria_updates_reach_other_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr('profiles.CHECK_INTERVAL', 0)
+    os.makedirs(tmp_path / 'profiles' / 'sales')
+    shutil.copy(os.path.join(REPO_DIR, 'data.csv'), tmp_path / 'profiles' / 'sales' / 'data.csv')
+    worker_a, worker_b = _registry(tmp_path), _registry(tmp_path)
+    assert worker_b.get('sales').criteria['max_ctc'] == 6
+
+    assert worker_a.update_criteria('sales', {'max_ctc': 8})['max_ctc'] == 8
+    assert worker_b.get('sales').criteria['max_ctc'] == 8
+    # Profiles built later start from the saved criteria too
+    assert _registry(tmp_path).get('sales').criteria['max_ctc'] == 8
@@ -0,0 +1,45 @@
+from candidate_store import CandidateStore
+from qualification import UNANSWERED, meets_criteria, parse_answers
+
+CRITERIA = {
+    'min_experience': 2,
+    'min_ctc': 1,
+    'max_ctc': 6,
+    'notice_period_max': 60,
+    'allowed_products': ['home loan', 'lap'],
+}
+
+# An unemployed candidate skips the notice step
+UNEMPLOYED = {'company': 'Bajaj Finance', 'ctc': '4 lpa', 'product': 'home loan', 'experience': '3 years'}
+
+
+def test_unasked_notice_is_zero_days():
+    for answers in (UNEMPLOYED, dict(UNEMPLOYED, notice=UNANSWERED), dict(UNEMPLOYED, notice='')):
+        parsed = parse_answers(answers)
+        assert parsed['notice_days'] == 0
+        assert meets_criteria(parsed, answers['product'], CRITERIA)
+
+
+def test_unreadable_notice_does_not_qualify():
+    parsed = parse_answers(dict(UNEMPLOYED, notice='not sure'))
+    assert parsed['notice_days'] is None
+    assert not meets_criteria(parsed, 'home loan', CRITERIA)
+
+
+def test_unemployed_candidate_stored_with_zero_notice(tmp_path):
+    path = str(tmp_path / 'bot.db')
+    fields = dict(UNEMPLOYED, name='Bajaj Finance', notice=UNANSWERED, qualified=True)
+
+    candidate = CandidateStore(path, legacy_file=None).upsert('919000000001', fields)
+    assert candidate['notice_days'] == 0
+    assert candidate['qualified']
+
+
+def test_legacy_unemployed_candidate_imported_with_zero_notice(tmp_path):
+    legacy = tmp_path / 'candidates.json'
+    legacy.write_text('[{"id": 1, "phone": "919000000002", "notice": "Unknown", "ctc": "4 lpa", '
+                      '"experience": "3 years", "product": "home loan", "qualified": true}]')
+
+    store = CandidateStore(str(tmp_path / 'bot.db'), legacy_file=str(legacy))
+    [candidate] = store.page(limit=10)[0]
+    assert candidate['notice_days'] == 0
@@ -0,0 +1,22 @@
+import time
+
+from router import HybridRouter, RouteDecision
+
+
+def test_old_decisions_are_pruned(tmp_path):
+    router = HybridRouter(path=str(tmp_path / 'bot.db'), ttl=3600)
+    now = time.time()
+    router._pending.extend([
+        (now - 7200, 'default', 'ctc', 'rules', 1.0, 'keyword', 0.6),
+        (now - 60, 'default', 'ctc', 'llm', 0.2, 'question', 0.6),
+    ])
+    router.flush()
+    assert router.prune(now) == 1
+    assert sum(bucket['rules'] + bucket['llm'] for bucket in router.stats()['recorded_by_confidence'].values()) == 1
+
+
+def test_ttl_zero_keeps_everything(tmp_path):
+    router = HybridRouter(path=str(tmp_path / 'bot.db'), ttl=0)
+    router.record(RouteDecision('rules', 1.0, 'keyword'), 'default', 'ctc')
+    router.flush()
+    assert router.prune(time.time() + 10 ** 9) == 0
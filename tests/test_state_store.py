@@ -0,0 +1,34 @@
+import threading
+import time
+
+import state_store
+from state_store import SqliteStateStore
+
+
+def test_batch_keeps_its_locks_past_the_lease(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_store, 'LOCK_LEASE_SECONDS', 0.3)
+    monkeypatch.setattr(state_store, 'LOCK_RENEW_SECONDS', 0.05)
+    path = str(tmp_path / 'bot.db')
+    # Two stores on one database stand in for two worker processes
+    batch_worker = SqliteStateStore(path, legacy_file=None)
+    other_worker = SqliteStateStore(path, legacy_file=None)
+    held = threading.Event()
+    times = {}
+
+    def batch():
+        with batch_worker.lock_many(['b@c.us', 'a@c.us']):
+            held.set()
+            time.sleep(1.0)
+            times['released'] = time.time()
+
+    def ask():
+        held.wait()
+        with other_worker.lock('a@c.us'):
+            times['acquired'] = time.time()
+
+    threads = [threading.Thread(target=batch), threading.Thread(target=ask)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert times['acquired'] >= times['released']